@@ -10,8 +10,10 @@ from typing import Optional
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import httpx
 import structlog
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
+from qdrant_client import AsyncQdrantClient
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest, multiprocess
 from starlette.responses import Response
 
 from opentelemetry import trace
@@ -96,6 +98,15 @@ async def lifespan(app: FastAPI):
     # Set services in app state (no cache service)
     app.state.settings = settings
     
+    # One pooled HTTP/2 client for TEI, reranker and Qdrant calls across requests
+    app.state.http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(30.0, connect=2.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=32)
+    )
+    # Qdrant searches and upserts go over gRPC (binary vectors instead of JSON floats)
+    app.state.qdrant_client = AsyncQdrantClient(url=settings.QDRANT_URL, prefer_grpc=True)
+    
     logger.info("API initialization complete")
     
     yield
@@ -103,6 +114,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Ask MaaS Orchestrator API")
     
+    await app.state.http_client.aclose()
+    await app.state.qdrant_client.close()
+    
     logger.info("Shutdown complete")
 
 # Create FastAPI app
@@ -253,9 +267,19 @@ async def liveness_check():
     """Liveness probe - checks if the application is running"""
     return {"status": "alive"}
 
+# With several workers each process writes its samples under
+# PROMETHEUS_MULTIPROC_DIR; aggregate them at scrape time
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    metrics_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(metrics_registry)
+else:
+    metrics_registry = None
+
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
+    if metrics_registry is not None:
+        return Response(content=generate_latest(metrics_registry), media_type="text/plain")
     return Response(content=generate_latest(), media_type="text/plain")
 
 @app.get("/")
@@ -76,7 +76,7 @@ async def chat_endpoint(
     settings = app.state.settings
     
     # Initialize services - use vector retrieval for semantic search
-    vector_retrieval_service = VectorRetrievalService(settings)
+    vector_retrieval_service = VectorRetrievalService(settings, http_client=app.state.http_client)
     llm_service = LLMService(settings)
     
     async def generate_response() -> AsyncGenerator[str, None]:
@@ -156,18 +156,12 @@ async def chat_endpoint(
                         for i, chunk in enumerate(retrieved_chunks)
                     ]
                     
-                    # Try citation expansion
-                    async def expand_citations():
-                        return await asyncio.to_thread(
-                            expand_context, 
-                            request.query, 
-                            base_chunks,
-                            800
-                        )
-                    
-                    citation_snippets, citation_metadata = await asyncio.wait_for(
-                        expand_citations(),
-                        timeout=1.0
+                    # Expansion no longer does I/O (all content lives in Qdrant),
+                    # so call it inline rather than paying for a thread hop
+                    citation_snippets, citation_metadata = expand_context(
+                        request.query,
+                        base_chunks,
+                        800
                     )
                     
                     if citation_snippets:
@@ -178,8 +172,6 @@ async def chat_endpoint(
                         )
                         citation_snippets_found = citation_snippets
                     
-                except asyncio.TimeoutError:
-                    logger.warning("Citation expansion timed out", request_id=request_id)
                 except Exception as e:
                     logger.warning("Citation expansion failed", request_id=request_id, error=str(e))
             
@@ -48,7 +48,11 @@ async def chat_unified(request: ChatRequest, req: Request) -> EventSourceRespons
             llm_service = app.state.llm_service
             
             # Use unified retrieval
-            unified_service = UnifiedVectorRetrievalService(settings)
+            unified_service = UnifiedVectorRetrievalService(
+                settings,
+                http_client=app.state.http_client,
+                qdrant_client=app.state.qdrant_client
+            )
             
             # Send initial acknowledgment
             yield create_sse_message({
@@ -72,7 +76,7 @@ async def chat_unified(request: ChatRequest, req: Request) -> EventSourceRespons
                 logger.info(f"Reranking {len(retrieved_chunks)} chunks", request_id=request_id)
                 # Rerank and take top 15
                 from app.services.vector_retrieval import VectorRetrievalService
-                vector_service = VectorRetrievalService(settings)
+                vector_service = VectorRetrievalService(settings, http_client=app.state.http_client)
                 retrieved_chunks = await vector_service.rerank_chunks(request.query, retrieved_chunks)
                 retrieved_chunks = retrieved_chunks[:15]
             
@@ -195,7 +199,11 @@ async def ingest_unified(request: dict, req: Request):
         app = req.app
         settings = app.state.settings
         
-        unified_service = UnifiedVectorRetrievalService(settings)
+        unified_service = UnifiedVectorRetrievalService(
+            settings,
+            http_client=app.state.http_client,
+            qdrant_client=app.state.qdrant_client
+        )
         
         # Extract content
         text = request.get("content", "")
@@ -1,8 +1,6 @@
 """
 Simplified citation expansion without Redis dependency
 """
-import os
-import time
 import logging
 from typing import List, Dict, Any, Tuple
 
@@ -25,24 +23,9 @@ def expand_context(
     Returns:
         Tuple of (expanded snippets, metadata)
     """
-    start_time = time.time() * 1000
-    
-    metadata = {
-        "citations_found": 0,
-        "urls_enqueued": 0,
-        "time_ms": int(time.time() * 1000 - start_time)
-    }
-    
     # Return empty snippets since we're not using citation expansion anymore
-    # All content is already in Qdrant
-    return [], metadata
-
-def rerank_results(query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """
-    Simplified reranking - just returns results as-is
-    Actual reranking happens in the main retrieval pipeline
-    """
-    return results
+    # All content is already in Qdrant, so there is nothing to time either
+    return [], {"citations_found": 0, "urls_enqueued": 0, "time_ms": 0}
 
 def format_citation_snippet(citation: Dict[str, Any]) -> str:
     """
@@ -3,10 +3,23 @@ Configuration settings for Ask MaaS API
 """
 from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field, field_validator
+from pydantic import Field, PrivateAttr, field_validator
+import functools
+import hashlib
 import json
 
 
+def _tag(url: str) -> str:
+    """Short stable digest of a URL, used as a Redis Cluster hashtag"""
+    return hashlib.sha1(url.encode()).hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_cache_key(page_url: str, etag: str) -> str:
+    """Build (and memoize) the page-index cache key for hot pages"""
+    return f"ask-maas:index:{{{_tag(page_url)}}}:{etag}"
+
+
 class Settings(BaseSettings):
     """Application settings with environment variable support"""
     
@@ -156,12 +169,23 @@ Guidelines:
     ENABLE_METRICS: bool = Field(default=True, env="ENABLE_METRICS")
     ENABLE_TRACING: bool = Field(default=True, env="ENABLE_TRACING")
     
+    _redis_url: str = PrivateAttr(default="")
+    
+    def model_post_init(self, __context) -> None:
+        """Precompute derived connection strings once settings are loaded"""
+        if self.REDIS_PASSWORD:
+            self._redis_url = f"redis://:{self.REDIS_PASSWORD}@{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
+        else:
+            self._redis_url = f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
+    
     def get_redis_url(self) -> str:
         """Get Redis connection URL"""
-        if self.REDIS_PASSWORD:
-            return f"redis://:{self.REDIS_PASSWORD}@{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
-        return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
+        return self._redis_url
     
     def get_cache_key(self, page_url: str, etag: str) -> str:
-        """Generate cache key for page index"""
-        return f"ask-maas:index:{page_url}:{etag}"
+        """Generate cache key for page index
+
+        The URL is hashed into a {hashtag} so every key for a page lands in
+        the same cluster slot and contains no glob metacharacters.
+        """
+        return _format_cache_key(page_url, etag)
@@ -1,15 +1,70 @@
 """
 GitHub service for fetching repository files
 """
+import asyncio
 import base64
-from typing import List, Dict, Optional
+import re
+from typing import AsyncIterator, List, Dict, Optional
 import httpx
+import ijson
 import structlog
 
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
 from app.services.config import Settings
 
 logger = structlog.get_logger()
 
+# Common documentation and config files accepted regardless of allowed paths
+COMMON_FILE_PATTERNS = [
+    "README", ".md", ".yaml", ".yml", ".json",
+    "Dockerfile", "docker-compose", ".sh", ".py"
+]
+
+# Concurrent blob fetches per fetch_files call and the per-call file limit
+FETCH_WORKERS = 8
+MAX_FILES = 10
+
+
+def _allowed_file_expressions(allowed_paths: List[str]) -> List[str]:
+    """
+    Translate allowed path settings into regex expressions
+    """
+    expressions = []
+    for allowed_path in allowed_paths:
+        escaped = re.escape(allowed_path)
+        if allowed_path.endswith("/"):
+            # Directory pattern
+            expressions.append(f"^{escaped}")
+        elif "." in allowed_path:
+            # File name with extension, matched as a suffix
+            expressions.append(f"{escaped}$")
+        else:
+            # Exact file or file in any directory
+            expressions.append(f"(?:^|/){escaped}$")
+    
+    expressions.extend(re.escape(pattern) for pattern in COMMON_FILE_PATTERNS)
+    return expressions
+
+
+class _AsyncByteReader:
+    """Async file-like adapter so ijson can read from an httpx byte stream"""
+    
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks
+    
+    async def read(self, size: int = -1) -> bytes:
+        if size == 0:
+            return b""
+        async for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b""
+
 
 class GitHubService:
     """Service for interacting with GitHub API"""
@@ -24,10 +79,30 @@ class GitHubService:
         if settings.GITHUB_TOKEN:
             headers["Authorization"] = f"token {settings.GITHUB_TOKEN}"
         
+        # HTTP/2 lets concurrent blob fetches share one connection to api.github.com
         self.http_client = httpx.AsyncClient(
+            http2=True,
             timeout=30.0,
-            headers=headers
+            headers=headers,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
         )
+        
+        # Compile allowed path patterns once; a repo tree can have 10k+ blobs
+        expressions = _allowed_file_expressions(settings.GITHUB_ALLOWED_PATHS)
+        self._allowed_re = re.compile("|".join(expressions))
+        self._allowed_db = None
+        if HYPERSCAN_AVAILABLE:
+            try:
+                db = hyperscan.Database()
+                db.compile(
+                    expressions=[e.encode() for e in expressions],
+                    ids=list(range(len(expressions))),
+                    elements=len(expressions),
+                    flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(expressions)
+                )
+                self._allowed_db = db
+            except Exception as e:
+                logger.warning(f"Hyperscan compile failed, using re matcher: {e}")
     
     async def resolve_ref(self, repo: str, ref: Optional[str] = None) -> str:
         """
@@ -87,57 +162,91 @@ class GitHubService:
         """
         Fetch files from a GitHub repository
         """
-        files = []
+        # Fetched files keyed by tree index, so the result doesn't depend on completion order
+        files: Dict[int, Dict[str, str]] = {}
+        done = asyncio.Event()
+        queue: asyncio.Queue = asyncio.Queue()
+        # One slot per file still wanted: queued or in-flight candidates plus stored files never
+        # exceed MAX_FILES, and a failed fetch hands its slot back for the next candidate
+        slots = asyncio.Semaphore(MAX_FILES)
         
-        try:
-            # Get the tree for the commit
-            response = await self.http_client.get(
-                f"https://api.github.com/repos/{repo}/git/trees/{sha}",
-                params={"recursive": "true"}
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to get tree for {repo}@{sha}")
-                return []
-            
-            tree = response.json()
-            
-            # Filter files based on path
-            for item in tree.get("tree", []):
-                if item["type"] != "blob":
-                    continue
-                
-                item_path = item["path"]
-                
-                # Check if path matches
-                if path and not item_path.startswith(path):
-                    continue
-                
-                # Check if file is allowed
-                if not self._is_allowed_file(item_path):
-                    continue
+        async def worker():
+            while True:
+                entry = await queue.get()
+                if entry is None:
+                    return
+                index, item = entry
                 
                 # Fetch file content
                 file_content = await self._fetch_file_content(
-                    repo, item_path, sha
+                    repo, item["path"], sha
                 )
                 
                 if file_content:
-                    files.append({
-                        "path": item_path,
+                    files[index] = {
+                        "path": item["path"],
                         "content": file_content,
                         "sha": item["sha"]
-                    })
+                    }
+                    
+                    # Limit number of files; wake the tree reader so it stops
+                    if len(files) >= MAX_FILES:
+                        done.set()
+                        slots.release()
+                else:
+                    slots.release()
+        
+        workers = [asyncio.create_task(worker()) for _ in range(FETCH_WORKERS)]
+        
+        try:
+            # Stream the tree so blob fetches start before the full JSON arrives
+            async with self.http_client.stream(
+                "GET",
+                f"https://api.github.com/repos/{repo}/git/trees/{sha}",
+                params={"recursive": "true"}
+            ) as response:
+                if response.status_code != 200:
+                    logger.error(f"Failed to get tree for {repo}@{sha}")
+                    return []
                 
-                # Limit number of files
-                if len(files) >= 10:
-                    break
+                reader = _AsyncByteReader(response.aiter_bytes())
+                index = 0
+                async for item in ijson.items_async(reader, "tree.item"):
+                    if item["type"] != "blob":
+                        continue
+                    
+                    item_path = item["path"]
+                    
+                    # Check if path matches
+                    if path and not item_path.startswith(path):
+                        continue
+                    
+                    # Check if file is allowed
+                    if not self._is_allowed_file(item_path):
+                        continue
+                    
+                    await slots.acquire()
+                    if done.is_set():
+                        break
+                    
+                    await queue.put((index, item))
+                    index += 1
+            
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
             
-            return files
+            # Candidates are only queued while a file is still wanted, so these are the
+            # first MAX_FILES fetchable files in tree order
+            return [files[index] for index in sorted(files)]
             
         except Exception as e:
             logger.error(f"Error fetching files: {e}")
             return []
+        
+        finally:
+            for task in workers:
+                task.cancel()
     
     async def _fetch_file_content(
         self,
@@ -174,26 +283,17 @@ class GitHubService:
         """
         Check if a file path is allowed based on settings
         """
-        for allowed_path in self.settings.GITHUB_ALLOWED_PATHS:
-            if allowed_path.endswith("/"):
-                # Directory pattern
-                if file_path.startswith(allowed_path):
-                    return True
-            else:
-                # File pattern
-                if file_path == allowed_path or file_path.endswith(f"/{allowed_path}"):
-                    return True
-                # Also check for extensions
-                if "." in allowed_path and file_path.endswith(allowed_path):
-                    return True
-        
-        # Check for common documentation and config files
-        common_patterns = [
-            "README", ".md", ".yaml", ".yml", ".json",
-            "Dockerfile", "docker-compose", ".sh", ".py"
-        ]
+        if self._allowed_db is not None:
+            matched = []
+            
+            def on_match(id, start, end, flags, context):
+                matched.append(id)
+                return True  # Stop scanning on first match
+            
+            self._allowed_db.scan(file_path.encode(), match_event_handler=on_match)
+            return bool(matched)
         
-        return any(pattern in file_path for pattern in common_patterns)
+        return self._allowed_re.search(file_path) is not None
     
     async def close(self):
         """Clean up resources"""
@@ -1,10 +1,15 @@
 """
 Ingest service for processing articles and building indexes
 """
+import asyncio
+import functools
 import hashlib
+import os
 import re
-from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from lxml import etree, html as lxml_html
 import markdown
 import tiktoken
 import numpy as np
@@ -13,19 +18,235 @@ import httpx
 import structlog
 
 from app.services.config import Settings
+from app.utils.fast_json import post_json, response_json
 # from app.services.vectordb import VectorDBService  # Disabled for now
 
 logger = structlog.get_logger()
 
 
+@functools.lru_cache(maxsize=None)
+def _get_encoder() -> tiktoken.Encoding:
+    """Shared tokenizer - encoder construction is expensive, encode/decode are thread-safe"""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _fast_hash(data: bytes) -> str:
+    """Non-cryptographic content digest for chunk IDs and fallback ETags"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _has_class(*names: str) -> str:
+    """XPath predicate matching any of the given class tokens"""
+    return " or ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in names
+    )
+
+
+# Shared pool for HTML parsing and tokenization; lxml and tiktoken release the GIL
+_CPU_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="ingest-cpu")
+
+# Rough characters-per-token ratio for chunking without the tokenizer
+CHARS_PER_TOKEN = 4
+
+# Above this many chunks build_index switches from exact search to HNSW
+HNSW_THRESHOLD = 2000
+
+# Browser-like headers for page fetches, to avoid 403s from the article site
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": '"Windows"',
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Upgrade-Insecure-Requests": "1",
+    "Cache-Control": "max-age=0",
+}
+
+# Patterns used on every page
+_INTERNAL_URL_RE = re.compile(r'https://ask-maas-frontend\.apps\.[^/]+')
+_INTERNAL_URL = "http://ghost-article-site-service.ask-maas-frontend.svc.cluster.local:3000"
+_MULTI_NL_RE = re.compile(r'\n{3,}')
+_HEADING_RE = re.compile(r"^(#{1,6})[^\S\n]+(.+)$", re.MULTILINE)
+_GITHUB_RE = re.compile(r'https://github\.com/[^\s\'"<>]+')
+
+# lxml serializes concurrent use of one parser, so each pool thread keeps its own
+_parsers = threading.local()
+
+
+def _html_parser(encoding: str) -> lxml_html.HTMLParser:
+    """Per-thread HTML parser decoding input with the given encoding"""
+    by_encoding = getattr(_parsers, "by_encoding", None)
+    if by_encoding is None:
+        by_encoding = _parsers.by_encoding = {}
+    parser = by_encoding.get(encoding)
+    if parser is None:
+        parser = by_encoding[encoding] = lxml_html.HTMLParser(encoding=encoding)
+    return parser
+
+# Chrome around the article - Red Hat Developer and PatternFly classes
+_BOILERPLATE_XPATH = etree.XPath(
+    "//*[" + _has_class("site-header", "site-footer", "sidebar",
+                        "navigation", "breadcrumb", "pf-c-nav") + "]"
+)
+
+# Main content candidates in priority order - Red Hat Developer specific first
+_MAIN_CONTENT_XPATHS = [
+    etree.XPath(f"(//*[{_has_class(name)}])[1]")
+    for name in ("rhd-c-article", "article-content", "pf-c-content", "main-content")
+] + [
+    etree.XPath("(//main)[1]"),
+    etree.XPath("(//article)[1]"),
+    etree.XPath(f"(//*[{_has_class('content')}])[1]"),
+    etree.XPath("(//*[@id='content'])[1]"),
+    etree.XPath("(//*[@role='main'])[1]"),
+    etree.XPath("(//body)[1]"),
+]
+
+# Elements whose text never reaches the markdown output
+_MARKDOWN_SKIP_TAGS = {"script", "style", "noscript"}
+_MARKDOWN_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+def _render_markdown_children(elem: lxml_html.HtmlElement, out: List[str]) -> None:
+    """Append the markdown for elem's text and children (with their tails) to out"""
+    if elem.text:
+        out.append(elem.text)
+    for child in elem:
+        _render_markdown(child, out)
+        if child.tail:
+            out.append(child.tail)
+
+
+def _render_markdown_text(
+    elem: lxml_html.HtmlElement,
+    out: List[str],
+    render_ul: bool = False,
+    render_ol: bool = False
+) -> None:
+    """
+    Append the text of a list item or link to out, excluding elem's tail. Only the
+    constructs converted before lists and links render as markdown: headings, code
+    blocks and inline code, plus unordered lists inside ordered ones and any list
+    inside a link; everything else contributes its plain text
+    """
+    if elem.text:
+        out.append(elem.text)
+    for child in elem:
+        tag = child.tag
+        if not isinstance(tag, str) or tag in _MARKDOWN_SKIP_TAGS:
+            pass
+        elif (tag in _MARKDOWN_HEADINGS or tag in ("pre", "code")
+                or (tag == "ul" and render_ul) or (tag == "ol" and render_ol)):
+            _render_markdown(child, out)
+        else:
+            _render_markdown_text(child, out, render_ul, render_ol)
+        if child.tail:
+            out.append(child.tail)
+
+
+def _list_items(elem: lxml_html.HtmlElement) -> List[lxml_html.HtmlElement]:
+    """
+    Items of a list, flattened across nested lists - except that an ordered list
+    leaves the items of its nested unordered lists to those lists
+    """
+    items = []
+    for li in elem.iter("li"):
+        if elem.tag == "ol":
+            parent = li.getparent()
+            while parent is not None and parent is not elem and parent.tag != "ul":
+                parent = parent.getparent()
+            if parent is not elem:
+                continue
+        items.append(li)
+    return items
+
+
+def _render_markdown(elem: lxml_html.HtmlElement, out: List[str]) -> None:
+    """Append the markdown for elem, excluding its tail, to out"""
+    tag = elem.tag
+    if not isinstance(tag, str) or tag in _MARKDOWN_SKIP_TAGS:
+        # Comments, processing instructions and scripts
+        return
+    
+    if tag in _MARKDOWN_HEADINGS:
+        out.append(f"\n{'#' * int(tag[1])} {elem.text_content().strip()}\n")
+    
+    elif tag == "pre":
+        code = elem.find(".//code")
+        if code is None:
+            out.append(elem.text_content())
+            return
+        # Try to detect language from class
+        lang = ""
+        for cls in code.get("class", "").split():
+            if cls.startswith("language-"):
+                lang = cls.replace("language-", "")
+                break
+        out.append(f"\n```{lang}\n{code.text_content().strip()}\n```\n")
+    
+    elif tag == "code":
+        out.append(f"`{elem.text_content().strip()}`")
+    
+    elif tag == "ul" or tag == "ol":
+        items = []
+        for li in _list_items(elem):
+            item: List[str] = []
+            _render_markdown_text(li, item, render_ul=tag == "ol")
+            items.append("".join(item).strip())
+        if tag == "ul":
+            list_text = "\n".join(f"- {item}" for item in items)
+        else:
+            list_text = "\n".join(f"{i+1}. {item}" for i, item in enumerate(items))
+        out.append(f"\n{list_text}\n")
+    
+    elif tag == "a" and elem.get("href") and elem.text_content().strip():
+        label: List[str] = []
+        _render_markdown_text(elem, label, render_ul=True, render_ol=True)
+        out.append(f"[{''.join(label).strip()}]({elem.get('href')})")
+    
+    elif tag == "p":
+        inner: List[str] = []
+        _render_markdown_children(elem, inner)
+        out.append(f"\n{''.join(inner).strip()}\n")
+    
+    else:
+        _render_markdown_children(elem, out)
+
+
+_OG_TITLE_XPATH = etree.XPath("//meta[@property='og:title']")
+_ARTICLE_TITLE_XPATH = etree.XPath(
+    "//h1[" + _has_class("article-title", "page-title", "rhd-c-article__title") + "]"
+)
+_TITLE_XPATH = etree.XPath("//title")
+_AUTHOR_XPATH = etree.XPath("//meta[@name='author']")
+_PUBLISHED_XPATH = etree.XPath("//meta[@property='article:published_time']")
+
+
 class IngestService:
     """Service for document ingestion and indexing"""
     
     def __init__(self, cache_service, settings: Settings):
         self.cache_service = cache_service
         self.settings = settings
-        self.http_client = httpx.AsyncClient(timeout=30.0)
-        self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        # HTTP/2 lets concurrent embedding batches share a connection to TEI
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64)
+        )
+        self.tokenizer = _get_encoder()
+        # Any allowed path as a substring; (?!) never matches when none are configured
+        self._github_allowed_re = re.compile(
+            "|".join(re.escape(path) for path in settings.GITHUB_ALLOWED_PATHS) or "(?!)"
+        )
+        # Bound concurrent embedding batches sent to TEI
+        self._embed_sem = asyncio.Semaphore(8)
         # self.vectordb = VectorDBService(url=settings.QDRANT_URL)  # Disabled for now
     
     async def fetch_page(self, page_url: str) -> Optional[Dict]:
@@ -33,84 +254,45 @@ class IngestService:
         Fetch page content from URL - optimized for Red Hat Developer
         """
         try:
-            # Use a more comprehensive user agent to avoid 403 errors
             # Convert external URLs to internal service URLs for cluster access
             fetch_url = page_url
             if "ask-maas-frontend.apps." in page_url:
                 # Replace external route with internal service
                 # This dynamically handles any cluster domain
-                import re
-                pattern = r'https://ask-maas-frontend\.apps\.[^/]+'
-                internal_url = "http://ghost-article-site-service.ask-maas-frontend.svc.cluster.local:3000"
-                fetch_url = re.sub(pattern, internal_url, page_url)
+                fetch_url = _INTERNAL_URL_RE.sub(_INTERNAL_URL, page_url)
                 logger.info(f"Using internal URL for fetch: {fetch_url}")
             
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                "Sec-Ch-Ua-Mobile": "?0",
-                "Sec-Ch-Ua-Platform": '"Windows"',
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Upgrade-Insecure-Requests": "1",
-                "Cache-Control": "max-age=0",
-            }
-            
-            response = await self.http_client.get(fetch_url, headers=headers)
-            response.raise_for_status()
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract title - try multiple strategies
-            title = ""
-            # Try meta og:title first (common in Red Hat Developer)
-            og_title = soup.find("meta", property="og:title")
-            if og_title:
-                title = og_title.get("content", "")
-            else:
-                # Try article title
-                article_title = soup.find("h1", class_=["article-title", "page-title", "rhd-c-article__title"])
-                if article_title:
-                    title = article_title.get_text().strip()
-                else:
-                    # Fall back to regular title tag
-                    title_tag = soup.find("title")
-                    if title_tag:
-                        title = title_tag.text.strip()
-                        # Remove site name from title if present
-                        title = title.split(" | ")[0].strip()
-            
-            # Extract main content
-            content = self._extract_content(soup)
-            
-            # Convert to markdown for better structure
-            content = self._html_to_markdown(content)
-            
-            # Extract metadata
-            metadata = {}
-            # Try to get author
-            author_meta = soup.find("meta", {"name": "author"})
-            if author_meta:
-                metadata["author"] = author_meta.get("content", "")
+            async with self.http_client.stream(
+                "GET", fetch_url, headers=BROWSER_HEADERS
+            ) as response:
+                response.raise_for_status()
+                
+                # Hash the body as it streams in when the server sends no ETag
+                etag = response.headers.get("etag")
+                digest = None if etag else hashlib.blake2b(digest_size=16)
+                body = bytearray()
+                async for data in response.aiter_bytes():
+                    body.extend(data)
+                    if digest:
+                        digest.update(data)
+                
+                etag = etag or digest.hexdigest()
+                encoding = response.encoding or "utf-8"
             
-            # Try to get publication date
-            date_meta = soup.find("meta", property="article:published_time")
-            if date_meta:
-                metadata["published"] = date_meta.get("content", "")
+            # Parse off the event loop - lxml and markdown rendering are CPU-bound
+            loop = asyncio.get_running_loop()
+            title, content, metadata = await loop.run_in_executor(
+                _CPU_POOL, self._parse_page, bytes(body), encoding
+            )
             
             return {
                 "url": page_url,
                 "title": title,
                 "content": content,
-                "etag": response.headers.get("etag", hashlib.md5(response.text.encode()).hexdigest()),
-                "html": response.text,
-                "metadata": metadata
+                "etag": etag,
+                "html": body.decode(encoding, errors="replace"),
+                "metadata": metadata,
+                "is_markdown": True
             }
             
         except httpx.HTTPStatusError as e:
@@ -130,25 +312,87 @@ class IngestService:
         except Exception:
             return ""
     
+    def _parse_page(self, html: bytes, encoding: str) -> Tuple[str, str, Dict[str, str]]:
+        """
+        Extract title, markdown content and metadata from raw page HTML
+        """
+        # Parse HTML straight from the response bytes
+        tree = lxml_html.fromstring(html, parser=_html_parser(encoding))
+        
+        # Extract title - try multiple strategies
+        title = ""
+        # Try meta og:title first (common in Red Hat Developer)
+        og_title = _OG_TITLE_XPATH(tree)
+        if og_title:
+            title = og_title[0].get("content", "")
+        else:
+            # Try article title
+            article_title = _ARTICLE_TITLE_XPATH(tree)
+            if article_title:
+                title = article_title[0].text_content().strip()
+            else:
+                # Fall back to regular title tag
+                title_tag = _TITLE_XPATH(tree)
+                if title_tag:
+                    title = title_tag[0].text_content().strip()
+                    # Remove site name from title if present
+                    title = title.split(" | ")[0].strip()
+        
+        # Extract metadata before content extraction prunes the tree
+        metadata = {}
+        # Try to get author
+        author_meta = _AUTHOR_XPATH(tree)
+        if author_meta:
+            metadata["author"] = author_meta[0].get("content", "")
+        
+        # Try to get publication date
+        date_meta = _PUBLISHED_XPATH(tree)
+        if date_meta:
+            metadata["published"] = date_meta[0].get("content", "")
+        
+        # Extract main content
+        content = self._extract_content(tree)
+        
+        # Convert to markdown for better structure
+        content = self._html_to_markdown(content)
+        
+        return title, content, metadata
+    
     async def process_page(self, page_url: str, page_content: Dict) -> List[Dict]:
         """
         Process page content into chunks
         """
+        # Section splitting and tokenization are CPU-bound; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _CPU_POOL, self._process_page_sync, page_url, page_content
+        )
+    
+    def _process_page_sync(self, page_url: str, page_content: Dict) -> List[Dict]:
+        """
+        Split page content into sections and chunk them
+        """
         content = page_content.get("content", "")
         title = page_content.get("title", "")
         
-        # Convert HTML to markdown for better structure
-        if "<" in content and ">" in content:
+        # Convert HTML to markdown for better structure, unless fetch_page already did
+        if not page_content.get("is_markdown") and "<" in content and ">" in content:
             content = self._html_to_markdown(content)
         
         # Extract sections
         sections = self._extract_sections(content)
         
+        # Tokenize all sections in one batch call
+        all_tokens = self.tokenizer.encode_ordinary_batch(
+            [section["text"] for section in sections],
+            num_threads=os.cpu_count() or 1
+        )
+        
         # Chunk sections
         chunks = []
-        for section in sections:
-            section_chunks = self._chunk_text(
-                section["text"],
+        for section, tokens in zip(sections, all_tokens):
+            section_chunks = self._chunk_tokens(
+                tokens,
                 section["headings"],
                 page_url,
                 title
@@ -157,45 +401,33 @@ class IngestService:
         
         return chunks
     
-    def _extract_content(self, soup: BeautifulSoup) -> str:
+    def _extract_content(self, tree: lxml_html.HtmlElement) -> str:
         """
         Extract main content from HTML - optimized for Red Hat Developer articles
         """
-        # Remove script and style elements
-        for script in soup(["script", "style", "noscript"]):
-            script.decompose()
-        
-        # Also remove navigation, header, footer elements
-        for elem in soup(["nav", "header", "footer"]):
-            elem.decompose()
+        # Remove script, style, navigation, header and footer elements
+        # (tails are kept, matching BeautifulSoup's decompose)
+        etree.strip_elements(
+            tree, etree.Comment, "script", "style", "noscript", "nav", "header", "footer",
+            with_tail=False
+        )
         
         # Remove elements with specific classes common in Red Hat Developer
-        for elem in soup.find_all(class_=["site-header", "site-footer", "sidebar", 
-                                         "navigation", "breadcrumb", "pf-c-nav"]):
-            elem.decompose()
-        
-        # Look for main content areas - Red Hat Developer specific selectors first
-        main_content = (
-            soup.find(class_="rhd-c-article") or  # Red Hat Developer article class
-            soup.find(class_="article-content") or
-            soup.find(class_="pf-c-content") or   # PatternFly content class
-            soup.find(class_="main-content") or
-            soup.find("main") or
-            soup.find("article") or
-            soup.find(class_="content") or
-            soup.find(id="content") or
-            soup.find(role="main") or
-            soup.find("body")
-        )
+        for elem in _BOILERPLATE_XPATH(tree):
+            if elem.getparent() is not None:
+                elem.drop_tree()
         
-        if main_content:
-            # Extract text with better formatting
-            text = main_content.get_text(separator="\n", strip=True)
-            # Remove excessive blank lines
-            text = "\n".join(line for line in text.split("\n") if line.strip())
-            return text
+        # Look for main content areas in priority order
+        main_content = None
+        for xpath in _MAIN_CONTENT_XPATHS:
+            found = xpath(tree)
+            if found:
+                main_content = found[0]
+                break
         
-        return soup.get_text(separator="\n", strip=True)
+        # Extract text one line per text node, skipping blank lines
+        root = main_content if main_content is not None else tree
+        return "\n".join(text.strip() for text in root.itertext() if text.strip())
     
     def _html_to_markdown(self, html_content: str) -> str:
         """
@@ -206,60 +438,17 @@ class IngestService:
                 # Already plain text
                 return html_content
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Convert headers
-            for i in range(1, 7):
-                for header in soup.find_all(f"h{i}"):
-                    header.string = f"\n{'#' * i} {header.get_text().strip()}\n"
-            
-            # Convert code blocks with language detection
-            for pre in soup.find_all("pre"):
-                code = pre.find("code")
-                if code:
-                    # Try to detect language from class
-                    lang = ""
-                    if code.get("class"):
-                        classes = code.get("class")
-                        for cls in classes:
-                            if cls.startswith("language-"):
-                                lang = cls.replace("language-", "")
-                                break
-                    
-                    code_text = code.get_text().strip()
-                    pre.string = f"\n```{lang}\n{code_text}\n```\n"
-            
-            # Convert inline code
-            for code in soup.find_all("code"):
-                if code.parent.name != "pre":
-                    code.string = f"`{code.get_text().strip()}`"
-            
-            # Convert lists
-            for ul in soup.find_all("ul"):
-                items = ul.find_all("li")
-                list_text = "\n".join([f"- {item.get_text().strip()}" for item in items])
-                ul.string = f"\n{list_text}\n"
-            
-            for ol in soup.find_all("ol"):
-                items = ol.find_all("li")
-                list_text = "\n".join([f"{i+1}. {item.get_text().strip()}" 
-                                       for i, item in enumerate(items)])
-                ol.string = f"\n{list_text}\n"
-            
-            # Convert links
-            for link in soup.find_all("a"):
-                href = link.get("href", "")
-                text = link.get_text().strip()
-                if href and text:
-                    link.string = f"[{text}]({href})"
+            tree = lxml_html.document_fromstring(
+                html_content.encode("utf-8"), parser=_html_parser("utf-8")
+            )
             
-            # Convert paragraphs
-            for p in soup.find_all("p"):
-                p.string = f"\n{p.get_text().strip()}\n"
+            # Single pass over the tree, emitting markdown fragments
+            out: List[str] = []
+            _render_markdown(tree, out)
             
-            result = soup.get_text(separator="")
+            result = "".join(out)
             # Clean up excessive newlines
-            result = re.sub(r'\n{3,}', '\n\n', result)
+            result = _MULTI_NL_RE.sub('\n\n', result)
             return result.strip()
             
         except Exception as e:
@@ -270,43 +459,38 @@ class IngestService:
         """
         Extract sections with their headings
         """
-        sections = []
-        current_headings = []
-        current_text = []
+        matches = list(_HEADING_RE.finditer(content))
+        if not matches:
+            return [{"headings": [], "text": content.strip()}]
         
-        lines = content.split("\n")
-        
-        for line in lines:
-            # Check if it's a heading
-            heading_match = re.match(r"^(#{1,6})\s+(.+)$", line)
-            
-            if heading_match:
-                # Save previous section if exists
-                if current_text:
-                    sections.append({
-                        "headings": current_headings.copy(),
-                        "text": "\n".join(current_text).strip()
-                    })
-                
-                # Update heading hierarchy
-                level = len(heading_match.group(1))
-                heading_text = heading_match.group(2)
-                
-                # Update current headings based on level
-                current_headings = current_headings[:level-1]
-                current_headings.append(heading_text)
-                
-                current_text = []
-            else:
-                current_text.append(line)
+        sections = []
         
-        # Add last section
-        if current_text:
+        # Text before the first heading
+        if matches[0].start() > 0:
             sections.append({
-                "headings": current_headings.copy(),
-                "text": "\n".join(current_text).strip()
+                "headings": [],
+                "text": content[:matches[0].start()].strip()
             })
         
+        current_headings = []
+        for i, heading_match in enumerate(matches):
+            # Update current headings based on level
+            level = len(heading_match.group(1))
+            current_headings = current_headings[:level-1]
+            current_headings.append(heading_match.group(2))
+            
+            is_last = i + 1 == len(matches)
+            body = content[heading_match.end():len(content) if is_last else matches[i + 1].start()]
+            
+            # The body starts at the heading's newline and, except for the last
+            # heading, ends with the newline before the next one; anything more
+            # means there are lines in between
+            if body.count("\n") > (0 if is_last else 1):
+                sections.append({
+                    "headings": current_headings.copy(),
+                    "text": body.strip()
+                })
+        
         return sections if sections else [{"headings": [], "text": content}]
     
     def _chunk_text(
@@ -319,15 +503,37 @@ class IngestService:
         """
         Chunk text into smaller pieces
         """
+        # Article text carries no special tokens, so skip the special-token scan
+        return self._chunk_tokens(
+            self.tokenizer.encode_ordinary(text), headings, page_url, title
+        )
+    
+    def _chunk_tokens(
+        self,
+        tokens: List[int],
+        headings: List[str],
+        page_url: str,
+        title: str
+    ) -> List[Dict]:
+        """
+        Chunk pre-encoded tokens into smaller pieces
+        """
         chunks = []
         
-        # Tokenize text
-        tokens = self.tokenizer.encode(text)
-        
         # Calculate chunk parameters
         chunk_size = self.settings.CHUNK_SIZE
         overlap = self.settings.CHUNK_OVERLAP
         
+        # Decode once and slice windows by cumulative UTF-8 byte offsets
+        token_bytes = self.tokenizer.decode_tokens_bytes(tokens)
+        raw_bytes = b"".join(token_bytes)
+        offsets = np.zeros(len(token_bytes) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in token_bytes], out=offsets[1:])
+        
+        # Per-section values shared by every chunk
+        url_hash = _fast_hash(page_url.encode())
+        heading_anchor = f"#{'-'.join(headings).lower().replace(' ', '-')}" if headings else None
+        
         # Create chunks with overlap
         start = 0
         chunk_id = 0
@@ -336,16 +542,14 @@ class IngestService:
             end = min(start + chunk_size, len(tokens))
             chunk_tokens = tokens[start:end]
             
-            # Decode chunk
-            chunk_text = self.tokenizer.decode(chunk_tokens)
+            # Slice chunk text; windows may split a multi-byte character
+            chunk_text = raw_bytes[offsets[start]:offsets[end]].decode("utf-8", errors="ignore")
             
             # Create anchor for this chunk
-            anchor = f"#chunk-{chunk_id}"
-            if headings:
-                anchor = f"#{'-'.join(headings).lower().replace(' ', '-')}"
+            anchor = heading_anchor or f"#chunk-{chunk_id}"
             
             chunks.append({
-                "id": f"{hashlib.md5(page_url.encode()).hexdigest()}-{chunk_id}",
+                "id": f"{url_hash}-{chunk_id}",
                 "text": chunk_text,
                 "headings": headings,
                 "url": f"{page_url}{anchor}",
@@ -362,47 +566,106 @@ class IngestService:
         
         return chunks
     
+    def _chunk_text_by_chars(
+        self,
+        text: str,
+        headings: List[str],
+        page_url: str,
+        title: str
+    ) -> List[Dict]:
+        """
+        Chunk text into character windows, assuming ~4 characters per token
+        """
+        chunks = []
+        
+        # Calculate chunk parameters in characters
+        chunk_chars = self.settings.CHUNK_SIZE * CHARS_PER_TOKEN
+        overlap = self.settings.CHUNK_OVERLAP * CHARS_PER_TOKEN
+        
+        # Per-section values shared by every chunk
+        url_hash = _fast_hash(page_url.encode())
+        heading_anchor = f"#{'-'.join(headings).lower().replace(' ', '-')}" if headings else None
+        
+        # Create chunks with overlap
+        start = 0
+        chunk_id = 0
+        
+        while start < len(text):
+            end = min(start + chunk_chars, len(text))
+            chunk_text = text[start:end]
+            
+            # Create anchor for this chunk
+            anchor = heading_anchor or f"#chunk-{chunk_id}"
+            
+            chunks.append({
+                "id": f"{url_hash}-{chunk_id}",
+                "text": chunk_text,
+                "headings": headings,
+                "url": f"{page_url}{anchor}",
+                "title": title,
+                "source": "article",
+                "metadata": {
+                    "chunk_size": len(chunk_text) // CHARS_PER_TOKEN,  # Approximate tokens
+                    "position": chunk_id
+                }
+            })
+            
+            chunk_id += 1
+            start = end - overlap if end < len(text) else end
+        
+        return chunks
+    
     async def generate_embeddings(self, chunks: List[Dict]) -> np.ndarray:
         """
         Generate embeddings for chunks - optimized for batch processing
         """
-        embeddings = []
-        batch_size = 10  # Process in batches for better performance
+        batch_size = 32  # TEI is compute-bound; larger batches amortize per-request cost
         
-        # Process chunks in batches
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i+batch_size]
-            batch_texts = [chunk["text"] for chunk in batch]
-            
+        # Send all batches concurrently, bounded by the embedding semaphore
+        results = await asyncio.gather(*[
+            self._embed_batch([chunk["text"] for chunk in chunks[i:i+batch_size]])
+            for i in range(0, len(chunks), batch_size)
+        ])
+        
+        # Write batches straight into one preallocated matrix; failed batches stay zero
+        dimension = next((len(result[0]) for result in results if result), 768)
+        embeddings = np.zeros((len(chunks), dimension), dtype=np.float32)
+        for batch_num, result in enumerate(results):
+            if result:
+                start = batch_num * batch_size
+                embeddings[start:start + len(result)] = np.asarray(result, dtype=np.float32)
+        
+        # Embeddings live in the returned matrix (stored as the page index's
+        # "embeddings"), not on each chunk dict
+        return embeddings
+    
+    async def _embed_batch(self, batch_texts: List[str]) -> Optional[List[List[float]]]:
+        """
+        Embed one batch of texts, returning None on failure
+        """
+        async with self._embed_sem:
             try:
                 # Send batch request
-                response = await self.http_client.post(
+                response = await post_json(
+                    self.http_client,
                     f"{self.settings.TEI_EMBEDDINGS_URL}/embed",
-                    json={"inputs": batch_texts},
+                    {"inputs": batch_texts},
                     timeout=30.0
                 )
                 
                 if response.status_code == 200:
-                    result = response.json()
+                    result = response_json(response)
                     if result and len(result) == len(batch_texts):
-                        embeddings.extend(result)
-                    else:
-                        # Fallback for this batch
-                        embeddings.extend([[0.0] * 768 for _ in batch])
-                        logger.warning(f"Embedding batch size mismatch: expected {len(batch_texts)}, got {len(result) if result else 0}")
+                        return result
+                    # Fallback for this batch
+                    logger.warning(f"Embedding batch size mismatch: expected {len(batch_texts)}, got {len(result) if result else 0}")
                 else:
-                    embeddings.extend([[0.0] * 768 for _ in batch])
                     logger.error(f"Failed to generate embeddings batch: HTTP {response.status_code}")
                     
             except Exception as e:
                 logger.error(f"Failed to generate embedding batch: {str(e)}")
-                embeddings.extend([[0.0] * 768 for _ in batch])
         
-        # Store embeddings in chunks for later retrieval
-        for chunk, embedding in zip(chunks, embeddings):
-            chunk["embedding"] = embedding
-        
-        return np.array(embeddings, dtype=np.float32)
+        return None
     
     async def build_index(
         self,
@@ -411,13 +674,29 @@ class IngestService:
     ) -> faiss.Index:
         """
         Build FAISS index from embeddings
+        
+        Vectors are L2-normalized and indexed by inner product, so queries
+        must be normalized with faiss.normalize_L2 before searching
         """
-        # Create FAISS index
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
+        # Normalize a copy so callers keep their raw embeddings
+        vectors = np.array(embeddings, dtype=np.float32, copy=True)
+        faiss.normalize_L2(vectors)
+        
+        # Create FAISS index - exact search for typical pages, HNSW for large corpora;
+        # vectors are stored as fp16 to halve index memory
+        dimension = vectors.shape[1]
+        if vectors.shape[0] > HNSW_THRESHOLD:
+            index = faiss.IndexHNSWSQ(
+                dimension, faiss.ScalarQuantizer.QT_fp16, 32, faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = 40
+        else:
+            index = faiss.IndexScalarQuantizer(
+                dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
         
         # Add embeddings to index
-        index.add(embeddings)
+        index.add(vectors)
         
         return index
     
@@ -426,17 +705,22 @@ class IngestService:
         Extract GitHub links from page content
         """
         links = []
-        pattern = r'https://github\.com/[^\s\'"<>]+'
+        seen = set()
         
         content = page_content.get("html", "") or page_content.get("content", "")
-        matches = re.findall(pattern, content)
         
-        # Filter for allowed paths
-        for link in matches:
-            if any(allowed in link for allowed in self.settings.GITHUB_ALLOWED_PATHS):
+        for match in _GITHUB_RE.finditer(content):
+            link = match.group(0)
+            # Pages repeat header/footer links; check each URL only once
+            if link in seen:
+                continue
+            seen.add(link)
+            
+            # Filter for allowed paths
+            if self._github_allowed_re.search(link):
                 links.append(link)
         
-        return list(set(links))  # Remove duplicates
+        return links
     
     async def process_github_file(
         self,
@@ -448,7 +732,8 @@ class IngestService:
         """
         Process GitHub file into chunks
         """
-        chunks = self._chunk_text(
+        # Source files can be huge; character windows avoid tokenizing them
+        chunks = self._chunk_text_by_chars(
             text=content,
             headings=[repo, file_path],
             page_url=f"https://github.com/{repo}/blob/{sha}/{file_path}",
@@ -482,17 +767,16 @@ class IngestService:
             all_chunks = existing_chunks + new_chunks
             
             # Rebuild index with all embeddings
-            if existing_index:
-                # Extract existing embeddings
-                existing_embeddings = np.zeros(
-                    (len(existing_chunks), new_embeddings.shape[1]),
-                    dtype=np.float32
-                )
-                for i in range(len(existing_chunks)):
-                    existing_index.reconstruct(i, existing_embeddings[i:i+1])
-                
+            existing_embeddings = page_index.get("embeddings")
+            if existing_embeddings is None and existing_index:
+                # Older entries only carry the index; copy its vectors out in bulk
+                existing_embeddings = existing_index.reconstruct_n(0, existing_index.ntotal)
+            
+            if existing_embeddings is not None:
                 # Combine embeddings
-                all_embeddings = np.vstack([existing_embeddings, new_embeddings])
+                all_embeddings = np.vstack([
+                    existing_embeddings.astype(np.float32), new_embeddings
+                ])
             else:
                 all_embeddings = new_embeddings
             
@@ -504,6 +788,7 @@ class IngestService:
                 page_url=page_url,
                 etag=page_index.get("etag", ""),
                 index=new_index,
+                embeddings=all_embeddings.astype(np.float16),  # Half the cached size
                 chunks=all_chunks,
                 metadata=page_index.get("metadata", {})
             )
@@ -2,9 +2,9 @@
 LLM service for generating responses using vLLM
 """
 import asyncio
-import json
 from typing import AsyncGenerator, Optional
 import httpx
+import orjson
 import structlog
 
 from app.services.config import Settings
@@ -17,7 +17,11 @@ class LLMService:
     
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.http_client = httpx.AsyncClient(timeout=60.0)
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64)
+        )
     
     async def generate_stream(
         self,
@@ -56,21 +60,29 @@ class LLMService:
             ) as response:
                 response.raise_for_status()
                 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
+                # Split SSE lines on raw bytes; only data payloads get decoded
+                buffer = bytearray()
+                async for raw in response.aiter_bytes():
+                    buffer.extend(raw)
+                    while (newline := buffer.find(b"\n")) >= 0:
+                        line = bytes(buffer[:newline]).rstrip(b"\r")
+                        del buffer[:newline + 1]
+                        
+                        if not line.startswith(b"data: "):
+                            continue
                         data = line[6:]
-                        if data == "[DONE]":
-                            break
+                        if data == b"[DONE]":
+                            return
                         
                         try:
-                            chunk = json.loads(data)
+                            chunk = orjson.loads(data)
                             if "choices" in chunk and len(chunk["choices"]) > 0:
                                 # Handle chat completion format
                                 delta = chunk["choices"][0].get("delta", {})
                                 text = delta.get("content", "")
                                 if text:
                                     yield text
-                        except json.JSONDecodeError:
+                        except orjson.JSONDecodeError:
                             continue
                         
         except httpx.HTTPStatusError as e:
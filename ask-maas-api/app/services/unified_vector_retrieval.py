@@ -2,16 +2,30 @@
 Unified Vector Retrieval Service - Simple RAG with Qdrant
 """
 from typing import List, Dict, Any, Optional
+import asyncio
 import httpx
 import structlog
 import hashlib
 import time
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models as qmodels
 
 from app.services.config import Settings
 from app.models.chat import Chunk
+from app.utils.embedding_cache import query_embedding_cache
+from app.utils.fast_json import post_json, put_json, response_json
 
 logger = structlog.get_logger()
 
+# Texts per TEI /embed request (TEI's default max client batch size)
+EMBED_BATCH_SIZE = 32
+
+# Payload fields search_unified reads; everything else stays in Qdrant
+SEARCH_PAYLOAD_FIELDS = [
+    "doc_id", "text", "text_preview", "source_url", "page_url",
+    "title", "source_type", "content_type"
+]
+
 
 class UnifiedVectorRetrievalService:
     """
@@ -19,11 +33,26 @@ class UnifiedVectorRetrievalService:
     All content (articles + citations) are in one collection.
     """
     
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        http_client: Optional[httpx.AsyncClient] = None,
+        qdrant_client: Optional[AsyncQdrantClient] = None
+    ):
         self.settings = settings
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        # Prefer the app-wide client; standalone use gets a private one.
+        # HTTP/2 keeps TEI and Qdrant calls on reused, multiplexed connections
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
         self.embeddings_url = settings.TEI_EMBEDDINGS_URL
         self.qdrant_url = settings.QDRANT_URL
+        # Searches and upserts go over gRPC so vectors travel as packed floats, not JSON text
+        self._owns_qdrant_client = qdrant_client is None
+        self.qdrant_client = qdrant_client or AsyncQdrantClient(url=self.qdrant_url, prefer_grpc=True)
         # Use the existing citations collection that has all the content
         self.collection_name = "ask-maas-citations"
         
@@ -41,12 +70,21 @@ class UnifiedVectorRetrievalService:
                     "vectors": {
                         "size": 768,
                         "distance": "Cosine"
+                    },
+                    # int8 codes in RAM cut scanned bytes 4x; originals stay on disk for rescoring
+                    "quantization_config": {
+                        "scalar": {
+                            "type": "int8",
+                            "quantile": 0.99,
+                            "always_ram": True
+                        }
                     }
                 }
                 
-                response = await self.http_client.put(
+                response = await put_json(
+                    self.http_client,
                     f"{self.qdrant_url}/collections/{self.collection_name}",
-                    json=config
+                    config
                 )
                 logger.info(f"Created unified collection: {self.collection_name}")
         except Exception as e:
@@ -54,15 +92,21 @@ class UnifiedVectorRetrievalService:
     
     async def get_query_embedding(self, query: str) -> Optional[List[float]]:
         """Generate embedding for the query using TEI service"""
+        cached = query_embedding_cache.get(query)
+        if cached is not None:
+            return cached
+        
         try:
-            response = await self.http_client.post(
+            response = await post_json(
+                self.http_client,
                 f"{self.embeddings_url}/embed",
-                json={"inputs": [query]}
+                {"inputs": [query]}
             )
             
             if response.status_code == 200:
-                embeddings = response.json()
+                embeddings = response_json(response)
                 if embeddings and len(embeddings) > 0:
+                    query_embedding_cache.put(query, embeddings[0])
                     return embeddings[0]
             
             logger.warning(f"Failed to get embeddings: {response.status_code}")
@@ -72,6 +116,27 @@ class UnifiedVectorRetrievalService:
             logger.error(f"Embedding generation failed: {e}")
             return None
     
+    async def _embed_batch(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Generate embeddings for a batch of texts in one TEI request"""
+        try:
+            response = await post_json(
+                self.http_client,
+                f"{self.embeddings_url}/embed",
+                {"inputs": texts}
+            )
+            
+            if response.status_code == 200:
+                embeddings = response_json(response)
+                if embeddings and len(embeddings) == len(texts):
+                    return embeddings
+            
+            logger.warning(f"Failed to get batch embeddings: {response.status_code}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"Batch embedding generation failed: {e}")
+            return None
+    
     async def search_unified(
         self,
         query: str,
@@ -89,33 +154,25 @@ class UnifiedVectorRetrievalService:
                 logger.error("Failed to get query embedding")
                 return []
             
-            # Search in Qdrant - use simple request format that works
-            search_request = {
-                "vector": query_embedding,
-                "limit": top_k,
-                "with_payload": True
-            }
-            
-            # Add score threshold if specified
-            if score_threshold > 0:
-                search_request["score_threshold"] = score_threshold
-            
-            response = await self.http_client.post(
-                f"{self.qdrant_url}/collections/{self.collection_name}/points/search",
-                json=search_request
+            # Search in Qdrant
+            results = await self.qdrant_client.search(
+                collection_name=self.collection_name,
+                query_vector=query_embedding,
+                limit=top_k,
+                with_payload=SEARCH_PAYLOAD_FIELDS,
+                # Add score threshold if specified
+                score_threshold=score_threshold if score_threshold > 0 else None,
+                # Re-score quantized candidates with full-precision vectors
+                search_params=qmodels.SearchParams(
+                    quantization=qmodels.QuantizationSearchParams(rescore=True)
+                )
             )
             
-            if response.status_code != 200:
-                logger.error(f"Qdrant search failed: {response.status_code}, {response.text[:200]}")
-                return []
-            
-            results = response.json().get('result', [])
-            
             # Convert to Chunk objects
             chunks = []
             for i, result in enumerate(results):
-                payload = result.get('payload', {})
-                score = result.get('score', 0)
+                payload = result.payload or {}
+                score = result.score
                 
                 # Extract text
                 text = payload.get('text', payload.get('text_preview', ''))[:2000]
@@ -175,41 +232,49 @@ class UnifiedVectorRetrievalService:
                     if chunk.strip():
                         chunks.append(chunk)
             
-            indexed = 0
-            for i, chunk_text in enumerate(chunks):
-                # Get embedding
-                embedding = await self.get_query_embedding(chunk_text)
-                if not embedding:
+            # Embed all chunks in a few batched requests
+            batches = await asyncio.gather(*[
+                self._embed_batch(chunks[i:i + EMBED_BATCH_SIZE])
+                for i in range(0, len(chunks), EMBED_BATCH_SIZE)
+            ])
+            
+            points = []
+            for batch_num, embeddings in enumerate(batches):
+                if not embeddings:
                     continue
                 
-                # Create unique ID
-                doc_id = f"{source_type}_{hashlib.sha256(f'{source_url}_{i}'.encode()).hexdigest()[:16]}"
-                numeric_id = int(hashlib.sha256(doc_id.encode()).hexdigest()[:16], 16)
-                
-                # Prepare point
-                point = {
-                    "id": numeric_id,
-                    "vector": embedding,
-                    "payload": {
-                        "doc_id": doc_id,
-                        "text": chunk_text[:10000],
-                        "source_url": source_url,
-                        "title": title,
-                        "source_type": source_type,
-                        "chunk_index": i,
-                        "total_chunks": len(chunks),
-                        "indexed_at": time.time()
-                    }
-                }
-                
-                # Index to Qdrant
-                response = await self.http_client.put(
-                    f"{self.qdrant_url}/collections/{self.collection_name}/points",
-                    json={"points": [point]}
+                for offset, embedding in enumerate(embeddings):
+                    i = batch_num * EMBED_BATCH_SIZE + offset
+                    chunk_text = chunks[i]
+                    
+                    # Create unique ID
+                    doc_id = f"{source_type}_{hashlib.sha256(f'{source_url}_{i}'.encode()).hexdigest()[:16]}"
+                    numeric_id = int(hashlib.sha256(doc_id.encode()).hexdigest()[:16], 16)
+                    
+                    # Prepare point
+                    points.append(qmodels.PointStruct(
+                        id=numeric_id,
+                        vector=embedding,
+                        payload={
+                            "doc_id": doc_id,
+                            "text": chunk_text[:10000],
+                            "source_url": source_url,
+                            "title": title,
+                            "source_type": source_type,
+                            "chunk_index": i,
+                            "total_chunks": len(chunks),
+                            "indexed_at": time.time()
+                        }
+                    ))
+            
+            # Index all points to Qdrant in one request
+            indexed = 0
+            if points:
+                await self.qdrant_client.upsert(
+                    collection_name=self.collection_name,
+                    points=points
                 )
-                
-                if response.status_code == 200:
-                    indexed += 1
+                indexed = len(points)
             
             logger.info(f"Indexed {indexed}/{len(chunks)} chunks for {title}")
             return indexed
@@ -222,4 +287,7 @@ class UnifiedVectorRetrievalService:
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.http_client.aclose()
+        if self._owns_client:
+            await self.http_client.aclose()
+        if self._owns_qdrant_client:
+            await self.qdrant_client.close()
@@ -1,49 +1,88 @@
 """
 Vector-based retrieval service using embeddings and cosine similarity
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import heapq
 import httpx
+import numpy as np
 import structlog
-import math
 
 from app.services.config import Settings
 from app.models.chat import Chunk
+from app.utils.embedding_cache import query_embedding_cache
+from app.utils.fast_json import post_json, response_json
 
 logger = structlog.get_logger()
 
+RERANK_BATCH_SIZE = 32
+
 
 class VectorRetrievalService:
     """Service for vector-based document retrieval with semantic search"""
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, http_client: Optional[httpx.AsyncClient] = None):
         # No cache service - using Qdrant directly
         self.settings = settings
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        # Prefer the app-wide client; standalone use gets a private one
+        self._owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(timeout=30.0)
         self.embeddings_url = settings.TEI_EMBEDDINGS_URL
         self.reranker_url = settings.TEI_RERANKER_URL
     
-    def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = math.sqrt(sum(a * a for a in vec1))
-        magnitude2 = math.sqrt(sum(b * b for b in vec2))
+    @staticmethod
+    def _page_matrix(page_index: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        L2-normalized embedding matrix for a page's chunks and the chunk
+        index of each row, memoized on the page index
+        """
+        cached = page_index.get("_normalized_embeddings")
+        if cached is not None:
+            return cached
+        
+        chunks = page_index.get("chunks", [])
+        embeddings = page_index.get("embeddings")
+        if embeddings is not None:
+            # Contiguous float16 (N, d) matrix written by the indexer
+            matrix = np.asarray(embeddings).astype(np.float32)
+            chunk_indices = np.arange(len(matrix), dtype=np.int64)
+        else:
+            # Older entries carry one embedding list per chunk
+            chunk_indices = np.array(
+                [i for i, chunk in enumerate(chunks) if chunk.get("embedding") is not None
+                 and len(chunk["embedding"]) > 0],
+                dtype=np.int64
+            )
+            matrix = (
+                np.asarray([chunks[i]["embedding"] for i in chunk_indices], dtype=np.float32)
+                if len(chunk_indices) else np.empty((0, 0), dtype=np.float32)
+            )
         
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
+        if len(chunk_indices):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            # Zero vectors keep a similarity of 0
+            np.divide(matrix, norms, out=matrix, where=norms > 0)
         
-        return dot_product / (magnitude1 * magnitude2)
+        page_index["_normalized_embeddings"] = (matrix, chunk_indices)
+        return matrix, chunk_indices
     
     async def get_query_embedding(self, query: str) -> Optional[List[float]]:
         """Generate embedding for the query using TEI service"""
+        cached = query_embedding_cache.get(query)
+        if cached is not None:
+            return cached
+        
         try:
-            response = await self.http_client.post(
+            response = await post_json(
+                self.http_client,
                 f"{self.embeddings_url}/embed",
-                json={"inputs": [query]}
+                {"inputs": [query]}
             )
             
             if response.status_code == 200:
-                embeddings = response.json()
+                embeddings = response_json(response)
                 if embeddings and len(embeddings) > 0:
+                    query_embedding_cache.put(query, embeddings[0])
                     return embeddings[0]
             
             logger.warning(f"Failed to get embeddings: {response.status_code}")
@@ -72,7 +111,11 @@ class VectorRetrievalService:
                 logger.error("Could not generate query embedding")
                 return []
             
-            query_vector = query_embedding
+            # Normalize once so each page needs a single matrix-vector product
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            query_norm = np.linalg.norm(query_vector)
+            if query_norm > 0:
+                query_vector /= query_norm
             
             # No cache - return empty for now as we're using Qdrant
             all_page_urls = []
@@ -87,42 +130,51 @@ class VectorRetrievalService:
             all_chunks_with_scores = []
             total_chunks_searched = 0
             
-            # Process pages in parallel for better performance
-            for page_url in all_page_urls:
-                page_index = await self.cache_service.get_page_index(page_url)
+            # Fetch page indexes in parallel, bounded to avoid flooding the cache
+            semaphore = asyncio.Semaphore(32)
+            
+            async def fetch_page_index(page_url: str):
+                async with semaphore:
+                    return page_url, await self.cache_service.get_page_index(page_url)
+            
+            pages = await asyncio.gather(*[fetch_page_index(url) for url in all_page_urls])
+            
+            for page_url, page_index in pages:
                 if not page_index:
                     continue
                 
                 chunks = page_index.get("chunks", [])
                 page_title = page_index.get("metadata", {}).get("title", "Unknown")
                 
-                # Process each chunk's embedding
-                for i, chunk in enumerate(chunks):
-                    # Get embedding from chunk
-                    chunk_embedding = chunk.get("embedding")
-                    
-                    if chunk_embedding and len(chunk_embedding) > 0:
-                        # Calculate cosine similarity
-                        similarity = self.cosine_similarity(query_vector, chunk_embedding)
-                        
-                        # Only add chunks above threshold for efficiency
-                        if similarity > similarity_threshold:
-                            all_chunks_with_scores.append({
-                                "chunk": chunk,
-                                "score": float(similarity),
-                                "page_url": page_url,
-                                "page_title": page_title,
-                                "chunk_index": i
-                            })
-                        total_chunks_searched += 1
+                # Cosine similarity of every chunk at once
+                matrix, chunk_indices = self._page_matrix(page_index)
+                if len(chunk_indices) == 0:
+                    continue
+                similarities = matrix @ query_vector
+                total_chunks_searched += len(chunk_indices)
+                
+                # Only add chunks above threshold for efficiency
+                for row in np.nonzero(similarities > similarity_threshold)[0]:
+                    i = int(chunk_indices[row])
+                    all_chunks_with_scores.append({
+                        "chunk": chunks[i],
+                        "score": float(similarities[row]),
+                        "page_url": page_url,
+                        "page_title": page_title,
+                        "chunk_index": i
+                    })
             
             logger.info(f"Searched {total_chunks_searched} chunks, found {len(all_chunks_with_scores)} above threshold")
             
-            # Sort by similarity score
-            all_chunks_with_scores.sort(key=lambda x: x["score"], reverse=True)
-            
-            # Take top-k results with diversity
-            top_chunks = self._diversify_results(all_chunks_with_scores, top_k)
+            # Take top-k results with diversity. Diversifying only needs the best
+            # candidates, so select those in O(N log k) and fall back to a full
+            # sort only when per-page limits leave the selection short
+            by_score = lambda x: x["score"]
+            candidates = heapq.nlargest(top_k * 4, all_chunks_with_scores, key=by_score)
+            top_chunks = self._diversify_results(candidates, top_k)
+            if len(top_chunks) < top_k and len(candidates) < len(all_chunks_with_scores):
+                all_chunks_with_scores.sort(key=by_score, reverse=True)
+                top_chunks = self._diversify_results(all_chunks_with_scores, top_k)
             
             logger.info(f"Selected {len(top_chunks)} diverse chunks for query")
             
@@ -155,34 +207,51 @@ class VectorRetrievalService:
             logger.error(f"Vector retrieval failed: {e}", exc_info=True)
             return []
     
+    async def _rerank_batch(self, query: str, texts: List[str]) -> Optional[List[Dict]]:
+        """Score one batch of texts against the query, or None if the reranker failed"""
+        response = await post_json(
+            self.http_client,
+            f"{self.reranker_url}/rerank",
+            {
+                "query": query,
+                "texts": texts,
+                "raw_scores": False,
+                # Cap long chunks so they don't dominate cross-encoder latency
+                "truncate": True,
+                "truncation_direction": "Right"
+            }
+        )
+        
+        if response.status_code != 200:
+            logger.warning(f"Reranking failed: {response.status_code}")
+            return None
+        
+        return response_json(response)
+    
     async def rerank_chunks(self, query: str, chunks: List[Chunk]) -> List[Chunk]:
         """Rerank chunks using the reranker model for better relevance"""
         try:
-            # Prepare pairs for reranking
-            pairs = [[query, chunk.text] for chunk in chunks]
-            
-            response = await self.http_client.post(
-                f"{self.reranker_url}/rerank",
-                json={
-                    "query": query,
-                    "texts": [chunk.text for chunk in chunks],
-                    "raw_scores": False
-                }
-            )
+            # Send fixed-size batches concurrently to keep the reranker busy
+            offsets = range(0, len(chunks), RERANK_BATCH_SIZE)
+            texts = [chunk.text for chunk in chunks]
+            batches = await asyncio.gather(*[
+                self._rerank_batch(query, texts[start:start + RERANK_BATCH_SIZE])
+                for start in offsets
+            ])
             
-            if response.status_code == 200:
-                rerank_results = response.json()
-                
-                # Update chunk scores with rerank scores
+            if any(batch is None for batch in batches):
+                return chunks
+            
+            # Update chunk scores with rerank scores
+            for start, rerank_results in zip(offsets, batches):
                 for i, score in enumerate(rerank_results):
-                    if i < len(chunks):
-                        chunks[i].score = float(score.get("score", chunks[i].score))
-                
-                # Resort by new scores
-                chunks.sort(key=lambda x: x.score, reverse=True)
-                logger.info(f"Reranked {len(chunks)} chunks")
-            else:
-                logger.warning(f"Reranking failed: {response.status_code}")
+                    idx = start + score.get("index", i)
+                    if idx < len(chunks):
+                        chunks[idx].score = float(score.get("score", chunks[idx].score))
+            
+            # Resort by new scores
+            chunks.sort(key=lambda x: x.score, reverse=True)
+            logger.info(f"Reranked {len(chunks)} chunks")
         
         except Exception as e:
             logger.error(f"Error during reranking: {e}")
@@ -225,5 +294,6 @@ class VectorRetrievalService:
         return "\n\n".join(context_parts)
     
     async def close(self):
-        """Close HTTP client"""
-        await self.http_client.aclose()
+        """Close HTTP client if this service created it"""
+        if self._owns_client:
+            await self.http_client.aclose()
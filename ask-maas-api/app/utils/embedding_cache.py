@@ -0,0 +1,40 @@
+"""
+In-process cache for query embeddings
+"""
+import hashlib
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU of text -> embedding, keyed by a blake2b digest of the text
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, List[float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, or None on a miss"""
+        key = self._key(text)
+        embedding = self._entries.get(key)
+        if embedding is not None:
+            self._entries.move_to_end(key)
+        return embedding
+
+    def put(self, text: str, embedding: List[float]):
+        """Cache an embedding, evicting the least recently used entry when full"""
+        key = self._key(text)
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+# Shared across request-scoped retrieval services; repeat queries skip TEI
+query_embedding_cache = EmbeddingCache()
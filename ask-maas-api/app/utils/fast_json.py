@@ -0,0 +1,29 @@
+"""
+orjson-backed JSON helpers for httpx calls that carry embedding vectors
+"""
+from typing import Any
+
+import httpx
+import orjson
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize payload to JSON bytes, accepting numpy arrays as-is"""
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+async def post_json(client: httpx.AsyncClient, url: str, payload: Any, **kwargs) -> httpx.Response:
+    """POST payload as orjson-encoded JSON"""
+    return await client.post(url, content=dumps(payload), headers=JSON_HEADERS, **kwargs)
+
+
+async def put_json(client: httpx.AsyncClient, url: str, payload: Any, **kwargs) -> httpx.Response:
+    """PUT payload as orjson-encoded JSON"""
+    return await client.put(url, content=dumps(payload), headers=JSON_HEADERS, **kwargs)
+
+
+def response_json(response: httpx.Response) -> Any:
+    """Parse a response body with orjson"""
+    return orjson.loads(response.content)
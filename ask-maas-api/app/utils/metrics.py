@@ -6,6 +6,9 @@ import structlog
 
 logger = structlog.get_logger()
 
+# Model label values are limited to this set so the series count stays bounded
+KNOWN_MODELS = frozenset({"mistral-7b", "mistral-7b-instruct"})
+
 # Define metrics
 token_counter = Counter(
     'ask_maas_tokens_generated_total',
@@ -22,7 +25,7 @@ first_token_latency = Histogram(
 chunk_retrieval_count = Histogram(
     'ask_maas_chunks_retrieved',
     'Number of chunks retrieved per query',
-    buckets=[1, 5, 10, 15, 20, 30, 50]
+    buckets=[1, 5, 10, 20, 50]
 )
 
 reranker_score_histogram = Histogram(
@@ -43,6 +46,19 @@ retrieval_duration = Histogram(
 )
 
 
+# Labeled token_counter children, resolved once per model
+_token_children = {}
+
+
+def _token_child(model: str):
+    """Return the token_counter child for a model, creating it on first use"""
+    label = model if model in KNOWN_MODELS else "other"
+    child = _token_children.get(label)
+    if child is None:
+        child = _token_children[label] = token_counter.labels(model=label)
+    return child
+
+
 def track_request_duration(duration: float, endpoint: str):
     """Track request duration"""
     logger.info(
@@ -54,7 +70,7 @@ def track_request_duration(duration: float, endpoint: str):
 
 def track_token_usage(tokens: int, model: str = "mistral-7b"):
     """Track token usage"""
-    token_counter.labels(model=model).inc(tokens)
+    _token_child(model).inc(tokens)
     logger.info(
         "Tokens generated",
         tokens=tokens,
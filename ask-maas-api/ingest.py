@@ -4,11 +4,13 @@ Optimized ingestion script that ensures all articles are properly indexed with e
 for efficient global vector search - PURE RAG approach, no keyword matching
 """
 import asyncio
+import hashlib
 import os
 import sys
 import json
 import httpx
 import re
+from functools import lru_cache
 from pathlib import Path
 from bs4 import BeautifulSoup
 from typing import List, Dict
@@ -18,17 +20,32 @@ import time
 API_URL = os.getenv("API_URL", "http://localhost:8000")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 ARTICLES_DIR = os.getenv("ARTICLES_DIR", "/home/zdmytro/Work/ask-maas/articles")
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))
+MAX_RETRIES = 4
+CHUNK_CACHE_DIR = Path(os.getenv("CHUNK_CACHE_DIR", str(Path.home() / ".cache" / "ask-maas" / "chunks")))
 
 # Optimized chunking parameters for better context
 MAX_CHUNK_TOKENS = 800  # Smaller chunks for better precision
 CHUNK_OVERLAP_TOKENS = 100  # Some overlap for context continuity
 
+_TITLE_SUFFIX_RE = re.compile(r'\s*\|\s*Red Hat Developer.*$')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Keep the BPE vocab on local disk between runs instead of re-downloading it
+os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(Path.home() / ".cache" / "tiktoken"))
+
+@lru_cache(maxsize=None)
+def _get_tokenizer():
+    """Load the cl100k_base encoder once per process"""
+    return tiktoken.get_encoding("cl100k_base")
+
 def extract_article_content(html_path: Path) -> Dict:
     """Extract meaningful content from HTML file"""
     with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
         content = f.read()
     
-    soup = BeautifulSoup(content, 'html.parser')
+    # libxml2-backed parsing is several times faster than html.parser
+    soup = BeautifulSoup(content, 'lxml')
     
     # Remove script and style elements
     for element in soup(['script', 'style', 'nav', 'header', 'footer']):
@@ -39,7 +56,7 @@ def extract_article_content(html_path: Path) -> Dict:
     title_elem = soup.find('title')
     if title_elem:
         title = title_elem.text.strip()
-        title = re.sub(r'\s*\|\s*Red Hat Developer.*$', '', title)
+        title = _TITLE_SUFFIX_RE.sub('', title)
     
     # Extract main content
     main_content = soup.find('main') or soup.find('article') or soup.find('body')
@@ -59,18 +76,18 @@ def extract_article_content(html_path: Path) -> Dict:
 
 def create_semantic_chunks(text: str, title: str) -> List[Dict]:
     """Create semantic chunks optimized for vector search"""
-    tokenizer = tiktoken.get_encoding("cl100k_base")
-    
     # Split into sentences for better semantic boundaries
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    sentences = _SENTENCE_SPLIT_RE.split(text)
+    
+    # Count every sentence's tokens in one batched call
+    token_lens = [len(tokens) for tokens in _get_tokenizer().encode_ordinary_batch(sentences)]
     
     chunks = []
     current_chunk = []
     current_tokens = 0
+    last_tokens = 0
     
-    for sentence in sentences:
-        sentence_tokens = len(tokenizer.encode(sentence))
-        
+    for sentence, sentence_tokens in zip(sentences, token_lens):
         # If adding this sentence exceeds limit, save current chunk
         if current_tokens + sentence_tokens > MAX_CHUNK_TOKENS and current_chunk:
             chunk_text = ' '.join(current_chunk)
@@ -83,13 +100,14 @@ def create_semantic_chunks(text: str, title: str) -> List[Dict]:
             # Keep last sentence for overlap
             if CHUNK_OVERLAP_TOKENS > 0 and current_chunk:
                 current_chunk = [current_chunk[-1]]
-                current_tokens = len(tokenizer.encode(current_chunk[0]))
+                current_tokens = last_tokens
             else:
                 current_chunk = []
                 current_tokens = 0
         
         current_chunk.append(sentence)
         current_tokens += sentence_tokens
+        last_tokens = sentence_tokens
     
     # Add final chunk
     if current_chunk:
@@ -101,15 +119,44 @@ def create_semantic_chunks(text: str, title: str) -> List[Dict]:
     
     return chunks
 
+def load_or_create_chunks(text: str, title: str) -> List[Dict]:
+    """Return cached chunks for unchanged content, chunking and caching otherwise"""
+    # Chunker settings are part of the key so changing them invalidates the cache
+    key = hashlib.sha256(
+        f"{MAX_CHUNK_TOKENS}:{CHUNK_OVERLAP_TOKENS}:{title}:{text}".encode()
+    ).hexdigest()
+    cache_path = CHUNK_CACHE_DIR / f"{key}.json"
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    
+    chunks = create_semantic_chunks(text, title)
+    
+    try:
+        CHUNK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(chunks, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"   ⚠️  Could not cache chunks: {e}")
+    
+    return chunks
+
 async def ingest_article_optimized(client: httpx.AsyncClient, html_path: Path) -> bool:
     """Ingest article with optimized chunking and embedding generation"""
     try:
         # Extract content
-        article_data = extract_article_content(html_path)
+        # Parse and chunk in worker threads so other articles keep making progress;
+        # tiktoken releases the GIL inside its batch encoder
+        article_data = await asyncio.to_thread(extract_article_content, html_path)
         print(f"\n📄 Processing: {article_data['title'][:60]}...")
         
         # Create semantic chunks
-        chunks = create_semantic_chunks(article_data['content'], article_data['title'])
+        chunks = await asyncio.to_thread(load_or_create_chunks, article_data['content'], article_data['title'])
         print(f"   Created {len(chunks)} semantic chunks")
         
         # Prepare ingestion data
@@ -119,18 +166,23 @@ async def ingest_article_optimized(client: httpx.AsyncClient, html_path: Path) -
         chunk_texts = [f"[Chunk {i+1}]: {chunk['text']}" for i, chunk in enumerate(chunks)]
         combined_content = "\n\n".join(chunk_texts)
         
-        # Ingest with force refresh to ensure fresh embeddings
-        response = await client.post(
-            f"{API_URL}/api/v1/ingest/content",
-            json={
-                "page_url": page_url,
-                "title": article_data["title"],
-                "content": combined_content,
-                "content_type": "text",
-                "force_refresh": True
-            },
-            timeout=30.0
-        )
+        # Ingest with force refresh to ensure fresh embeddings, backing off
+        # when the API signals it is overloaded
+        for attempt in range(MAX_RETRIES + 1):
+            response = await client.post(
+                f"{API_URL}/api/v1/ingest/content",
+                json={
+                    "page_url": page_url,
+                    "title": article_data["title"],
+                    "content": combined_content,
+                    "content_type": "text",
+                    "force_refresh": True
+                },
+                timeout=30.0
+            )
+            if response.status_code not in (429, 503) or attempt == MAX_RETRIES:
+                break
+            await asyncio.sleep(0.5 * 2 ** attempt)
         
         if response.status_code == 200:
             result = response.json()
@@ -162,7 +214,8 @@ async def test_global_search(client: httpx.AsyncClient):
         print(f"\n❓ Query: '{query}'")
         try:
             # Use any page URL - the system should search globally
-            response = await client.post(
+            async with client.stream(
+                "POST",
                 f"{API_URL}/api/v1/chat",
                 json={
                     "query": query,
@@ -171,32 +224,37 @@ async def test_global_search(client: httpx.AsyncClient):
                 },
                 timeout=15.0,
                 headers={"Accept": "text/event-stream"}
-            )
-            
-            if response.status_code == 200:
-                # Parse SSE response
+            ) as response:
+                if response.status_code != 200:
+                    print(f"   ❌ Failed: HTTP {response.status_code}")
+                    continue
+                
+                # Parse SSE events as they arrive
                 content = ""
                 citations = []
                 
-                for line in response.text.split('\n'):
-                    if line.startswith('data: '):
-                        try:
-                            data = json.loads(line[6:])
-                            if data.get('type') == 'text':
-                                content += data.get('content', '')
-                            elif data.get('type') == 'citation':
-                                citations = data.get('citations', [])
-                        except:
-                            pass
-                
-                if content:
-                    print(f"   ✅ Response: {content[:150]}...")
-                    if citations:
-                        print(f"   📚 Sources: {', '.join([c.get('title', 'Unknown') for c in citations])}")
-                else:
-                    print(f"   ⚠️  No response generated")
+                async for line in response.aiter_lines():
+                    if not line.startswith('data: '):
+                        continue
+                    try:
+                        data = json.loads(line[6:])
+                    except ValueError:
+                        continue
+                    if data.get('type') == 'text':
+                        content += data.get('content', '')
+                    elif data.get('type') == 'citation':
+                        # Citations are the last event before "done"
+                        citations = data.get('citations', [])
+                        break
+                    elif data.get('type') == 'done':
+                        break
+            
+            if content:
+                print(f"   ✅ Response: {content[:150]}...")
+                if citations:
+                    print(f"   📚 Sources: {', '.join([c.get('title', 'Unknown') for c in citations])}")
             else:
-                print(f"   ❌ Failed: HTTP {response.status_code}")
+                print(f"   ⚠️  No response generated")
         except Exception as e:
             print(f"   ❌ Error: {e}")
 
@@ -222,20 +280,26 @@ async def main():
     print(f"📊 Chunk size: {MAX_CHUNK_TOKENS} tokens, Overlap: {CHUNK_OVERLAP_TOKENS} tokens")
     print("=" * 60)
     
-    async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(30.0),
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    ) as client:
         start_time = time.time()
-        successful = 0
-        failed = 0
         
-        # Process all articles
-        for html_file in html_files:
-            if await ingest_article_optimized(client, html_file):
-                successful += 1
-            else:
-                failed += 1
-            
-            # Small delay to avoid overwhelming the server
-            await asyncio.sleep(0.5)
+        # Load the encoder once up front rather than racing to build it in every worker thread
+        _get_tokenizer()
+        
+        # Process articles concurrently, bounded so the API isn't overwhelmed
+        semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+        
+        async def ingest(html_file: Path) -> bool:
+            async with semaphore:
+                return await ingest_article_optimized(client, html_file)
+        
+        results = await asyncio.gather(*[ingest(html_file) for html_file in html_files])
+        successful = sum(results)
+        failed = len(results) - successful
         
         ingestion_time = time.time() - start_time
         
@@ -0,0 +1,84 @@
+"""Tests for the GitHub service's streamed tree fetch"""
+
+import asyncio
+import base64
+import json
+import random
+
+import httpx
+
+from app.services.config import Settings
+from app.services.github import GitHubService, MAX_FILES
+
+
+def _tree_chunks(tree: dict, chunk_size: int = 64):
+    """Split a tree response body into small chunks, as a slow stream would deliver it"""
+    body = json.dumps(tree).encode()
+    
+    async def chunks():
+        for offset in range(0, len(body), chunk_size):
+            await asyncio.sleep(0)
+            yield body[offset:offset + chunk_size]
+    
+    return chunks()
+
+
+def _fetch(paths, missing=()):
+    """Run fetch_files against a mocked API, returning the files and the blob paths requested"""
+    tree = {
+        "tree": [{"type": "tree", "path": "docs", "sha": "t0"}]
+        + [{"type": "blob", "path": path, "sha": f"s{i}"} for i, path in enumerate(paths)]
+    }
+    requested = []
+    rng = random.Random(0)
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if "/git/trees/" in request.url.path:
+            return httpx.Response(200, content=_tree_chunks(tree))
+        
+        file_path = request.url.path.split("/contents/", 1)[1]
+        requested.append(file_path)
+        # Finish out of tree order
+        await asyncio.sleep(rng.random() / 100)
+        if file_path in missing:
+            return httpx.Response(404)
+        return httpx.Response(200, json={
+            "encoding": "base64",
+            "content": base64.b64encode(f"content of {file_path}".encode()).decode()
+        })
+    
+    async def run():
+        service = GitHubService(Settings(GITHUB_ALLOWED_PATHS=["docs/"]))
+        await service.http_client.aclose()
+        service.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await service.fetch_files("org/repo", "", "abc")
+        finally:
+            await service.close()
+    
+    return asyncio.run(run()), requested
+
+
+def test_fetch_files_keeps_tree_order_and_cap():
+    """Returns the first MAX_FILES allowed blobs in tree order, without fetching past them"""
+    paths = [f"docs/page{i:02d}.txt" for i in range(30)]
+    
+    files, requested = _fetch(paths)
+    
+    assert [f["path"] for f in files] == paths[:MAX_FILES]
+    assert [f["sha"] for f in files] == [f"s{i}" for i in range(MAX_FILES)]
+    assert files[0]["content"] == "content of docs/page00.txt"
+    assert sorted(requested) == paths[:MAX_FILES]
+
+
+def test_fetch_files_skips_failed_fetches():
+    """A blob that can't be fetched is replaced by the next allowed one in tree order"""
+    paths = [f"docs/page{i:02d}.txt" for i in range(30)] + ["src/main.c"]
+    missing = {"docs/page01.txt", "docs/page04.txt"}
+    
+    files, requested = _fetch(paths, missing=missing)
+    
+    expected = [path for path in paths if path not in missing][:MAX_FILES]
+    assert [f["path"] for f in files] == expected
+    assert "src/main.c" not in requested
+    assert len(requested) == MAX_FILES + len(missing)
@@ -0,0 +1,34 @@
+"""Tests for the ingest service's HTML to markdown conversion"""
+
+import pytest
+
+from app.services.ingest import IngestService
+
+
+@pytest.fixture
+def ingest_service():
+    """IngestService without its HTTP client and tokenizer, enough for conversion"""
+    return IngestService.__new__(IngestService)
+
+
+def test_html_to_markdown_list_item_inline_code(ingest_service):
+    """Inline code inside list items keeps its backticks"""
+    markdown = ingest_service._html_to_markdown("<ul><li>use <code>oc get</code></li></ul>")
+    
+    assert markdown == "- use `oc get`"
+
+
+def test_html_to_markdown_ordered_list_with_nested_unordered(ingest_service):
+    """A nested unordered list renders inside its item without renumbering the outer list"""
+    markdown = ingest_service._html_to_markdown(
+        "<ol><li>a<ul><li>x</li><li>y</li></ul></li><li>b</li></ol>"
+    )
+    
+    assert markdown == "1. a\n- x\n- y\n2. b"
+
+
+def test_html_to_markdown_link_with_code(ingest_service):
+    """Code inside a link label keeps its backticks"""
+    markdown = ingest_service._html_to_markdown("<p>see <a href='/k'><code>k</code></a> now</p>")
+    
+    assert markdown == "see [`k`](/k) now"
@@ -2,13 +2,22 @@
 
 import os
 import time
+import atexit
+import base64
 import hashlib
 import logging
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from urllib.parse import urlparse
 
+import httpx
+import numpy as np
+import orjson
 import redis
-import requests
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
 from rq import Queue
 
 logger = logging.getLogger(__name__)
@@ -19,59 +28,113 @@ TEI_URL = os.getenv("TEI_URL", "http://tei-embeddings:8080")
 QDRANT_URL = os.getenv("QDRANT_URL", "http://qdrant:6333")
 RERANKER_URL = os.getenv("RERANKER_URL", "http://tei-reranker:8080")
 CITATION_API_URL = os.getenv("CITATION_API_URL", "http://citation-expander:8000")
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
 
 # Initialize Redis client
 redis_client = redis.from_url(REDIS_URL, decode_responses=True)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Shared HTTP client so TEI/Qdrant/reranker calls reuse pooled connections
+_HTTP = httpx.Client(
+    http2=True,
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+)
+atexit.register(_HTTP.close)
+
+# Citation searches go over Qdrant's gRPC port: vectors travel as packed floats
+_QDRANT = QdrantClient(url=QDRANT_URL, prefer_grpc=True)
+atexit.register(_QDRANT.close)
+
+# Runs independent blocking I/O (enqueue calls, lookups) side by side
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="expand")
+
+
+def _pack_embedding(embedding: List[float]) -> bytes:
+    """Quantize an embedding to int8 with a per-vector scale, base64-encoded."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    scale = float(np.max(np.abs(vector))) if vector.size else 0.0
+    quantized = np.round(vector / scale * 127) if scale else np.zeros_like(vector)
+    return base64.b64encode(struct.pack("<f", scale) + quantized.astype(np.int8).tobytes())
+
+
+def _unpack_embedding(packed: str) -> List[float]:
+    """Inverse of _pack_embedding."""
+    raw = base64.b64decode(packed)
+    scale = struct.unpack_from("<f", raw)[0]
+    quantized = np.frombuffer(raw, dtype=np.int8, offset=4)
+    return (quantized.astype(np.float32) * (scale / 127.0)).tolist()
+
+
+def embed_query(query: str, timeout: int = 5) -> List[float]:
+    """Embed a query with TEI, memoized in Redis by content hash."""
+    key = "emb:q8:" + hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
+    
+    try:
+        cached = redis_client.get(key)
+        if cached:
+            return _unpack_embedding(cached)
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache lookup failed: {e}")
+    
+    response = _HTTP.post(
+        f"{TEI_URL}/embed",
+        content=orjson.dumps({"inputs": [query]}),
+        headers=_JSON_HEADERS,
+        timeout=timeout
+    )
+    response.raise_for_status()
+    packed = _pack_embedding(orjson.loads(response.content)[0])
+    
+    try:
+        # int8 codes take a quarter of the float32 bytes in Redis
+        redis_client.setex(key, EMBEDDING_CACHE_TTL, packed)
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache store failed: {e}")
+    
+    # Search with the same quantized vector a cache hit returns, so scores don't depend on cache state
+    return _unpack_embedding(packed)
+
 
 def search_citations_vectordb(
     query: str,
     filter_urls: Optional[List[str]] = None,
-    limit: int = 10
+    limit: int = 10,
+    score_threshold: Optional[float] = None,
+    timeout: int = 5
 ) -> List[Dict[str, Any]]:
     """Search citations in Qdrant vector database."""
     try:
         # First, get query embedding from TEI
-        response = requests.post(
-            f"{TEI_URL}/embed",
-            json={"inputs": [query]},
-            timeout=5
-        )
-        response.raise_for_status()
-        embedding = response.json()[0]
+        embedding = embed_query(query, timeout=timeout)
         
         # Search in Qdrant
-        search_payload = {
-            "vector": embedding,
-            "limit": limit,
-            "with_payload": True
-        }
-        
+        query_filter = None
         if filter_urls:
-            search_payload["filter"] = {
-                "should": [
-                    {"key": "source_url", "match": {"value": url}}
-                    for url in filter_urls
-                ]
-            }
+            query_filter = qmodels.Filter(should=[
+                qmodels.FieldCondition(key="source_url", match=qmodels.MatchValue(value=url))
+                for url in filter_urls
+            ])
         
-        response = requests.post(
-            f"{QDRANT_URL}/collections/ask-maas-citations/points/search",
-            json=search_payload,
-            timeout=5
+        results = _QDRANT.search(
+            collection_name="ask-maas-citations",
+            query_vector=embedding,
+            query_filter=query_filter,
+            limit=limit,
+            with_payload=True,
+            score_threshold=score_threshold,
+            timeout=timeout
         )
-        response.raise_for_status()
-        
-        results = response.json().get("result", [])
         
         return [
             {
-                "id": hit["id"],
-                "score": hit["score"],
-                "text": hit["payload"].get("text_preview", ""),
-                "source_url": hit["payload"].get("source_url"),
-                "title": hit["payload"].get("title"),
-                **hit["payload"]
+                "id": hit.id,
+                "score": hit.score,
+                "text": hit.payload.get("text_preview", ""),
+                "source_url": hit.payload.get("source_url"),
+                "title": hit.payload.get("title"),
+                **hit.payload
             }
             for hit in results
         ]
@@ -94,17 +157,18 @@ def rerank_results(
         texts = [doc.get("text", doc.get("text_preview", ""))[:1000] for doc in documents]
         
         # Call reranker
-        response = requests.post(
+        response = _HTTP.post(
             f"{RERANKER_URL}/rerank",
-            json={
+            content=orjson.dumps({
                 "query": query,
                 "texts": texts
-            },
+            }),
+            headers=_JSON_HEADERS,
             timeout=3
         )
         
         if response.status_code == 200:
-            scores = response.json()
+            scores = orjson.loads(response.content)
             
             # Add rerank scores and sort
             for i, doc in enumerate(documents):
@@ -129,7 +193,7 @@ def enqueue_url_for_processing(
 ) -> Optional[str]:
     """Enqueue URL for citation processing."""
     try:
-        response = requests.post(
+        response = _HTTP.post(
             f"{CITATION_API_URL}/enqueue",
             params={
                 "url": url,
@@ -154,11 +218,12 @@ def get_chunk_links(chunk_ids: List[str]) -> Dict[str, List[str]]:
     """Load per-chunk links from Redis hash."""
     chunk_links = {}
     
+    # Fetch every chunk's links in a single round trip
+    pipe = redis_client.pipeline(transaction=False)
     for chunk_id in chunk_ids:
-        # Try to get citation links for this chunk
-        redis_key = f"citation_links:{chunk_id}"
-        links_data = redis_client.hgetall(redis_key)
-        
+        pipe.hgetall(f"citation_links:{chunk_id}")
+    
+    for chunk_id, links_data in zip(chunk_ids, pipe.execute()):
         if links_data and "urls" in links_data:
             urls = links_data["urls"].split(",")
             chunk_links[chunk_id] = urls
@@ -166,6 +231,7 @@ def get_chunk_links(chunk_ids: List[str]) -> Dict[str, List[str]]:
     return chunk_links
 
 
+@lru_cache(maxsize=4096)
 def extract_domain(url: str) -> str:
     """Extract domain from URL for display."""
     try:
@@ -211,62 +277,20 @@ def expand_context(
     }
     
     try:
+        chunk_ids = [chunk["id"] for chunk in base_chunks if chunk.get("id")]
+        
         # ALWAYS do semantic search across all citations
         # This ensures we find the most relevant content regardless of whether
         # the article explicitly linked to it
         logger.info(f"Searching citations semantically for query: {query[:50]}...")
         
-        try:
-            # Generate query embedding
-            import requests
-            tei_url = os.getenv("TEI_URL", "http://tei-embeddings:8080")
-            response = requests.post(
-                f"{tei_url}/embed",
-                json={"inputs": [query]},
-                timeout=2
-            )
-            
-            if response.status_code == 200:
-                query_embedding = response.json()
-                if isinstance(query_embedding, list) and len(query_embedding) > 0:
-                    query_embedding = query_embedding[0]
-                
-                # Search Qdrant with the query embedding
-                qdrant_url = os.getenv("QDRANT_URL", "http://qdrant:6333")
-                search_response = requests.post(
-                    f"{qdrant_url}/collections/ask-maas-citations/points/search",
-                    json={
-                        "vector": query_embedding,
-                        "limit": 5,  # Get top 5 citations
-                        "with_payload": True,
-                        "score_threshold": 0.3  # Only include relevant results
-                    },
-                    timeout=2
-                )
-                
-                if search_response.status_code == 200:
-                    results = search_response.json().get("result", [])
-                    citations = []
-                    for r in results:
-                        payload = r.get("payload", {})
-                        citations.append({
-                            "source_url": payload.get("source_url", ""),
-                            "title": payload.get("title", "Citation"),
-                            "text": payload.get("text", payload.get("text_preview", "")),
-                            "score": r.get("score", 0)
-                        })
-                    
-                    logger.info(f"Found {len(citations)} citations via semantic search")
-                else:
-                    logger.warning(f"Qdrant search failed: {search_response.status_code}")
-                    citations = []
-            else:
-                logger.warning(f"TEI embedding failed: {response.status_code}")
-                citations = []
-                
-        except Exception as e:
-            logger.warning(f"Semantic citation search failed: {e}")
-            citations = []
+        citations = search_citations_vectordb(
+            query,
+            limit=5,  # Get top 5 citations
+            score_threshold=0.3,  # Only include relevant results
+            timeout=2
+        )
+        logger.info(f"Found {len(citations)} citations via semantic search")
         
         # Check timeout
         if (time.time() * 1000 - start_time) > timeout_ms * 0.7:
@@ -284,20 +308,31 @@ def expand_context(
             # Get already processed URLs
             processed_urls = {c.get("source_url") for c in citations}
             
+            # Links are only needed here; a failed lookup must not cost the snippets found
+            try:
+                chunk_links = get_chunk_links(chunk_ids)
+            except Exception as e:
+                logger.warning(f"Failed to load chunk links: {e}")
+                chunk_links = {}
+            
+            # Dedupe linked URLs, keeping first-seen order
+            unique_urls = dict.fromkeys(url for urls in chunk_links.values() for url in urls)
+            
             # Find unprocessed URLs
             unprocessed = [url for url in unique_urls if url not in processed_urls][:3]
             
-            # Enqueue for processing (fire and forget)
-            for url in unprocessed:
-                # Use first chunk as parent
-                if chunk_ids:
-                    job_id = enqueue_url_for_processing(
+            # Enqueue for processing concurrently, using first chunk as parent
+            if chunk_ids and unprocessed:
+                futures = [
+                    _EXECUTOR.submit(
+                        enqueue_url_for_processing,
                         url=url,
                         parent_doc_id=base_chunks[0].get("doc_id", "unknown"),
                         parent_chunk_id=chunk_ids[0]
                     )
-                    if job_id:
-                        metadata["urls_enqueued"] += 1
+                    for url in unprocessed
+                ]
+                metadata["urls_enqueued"] = sum(1 for future in futures if future.result())
         
         # Format citation snippets
         for citation in citations:
@@ -1,9 +1,10 @@
 """Citation Expander FastAPI Application with Health and Metrics."""
 
 import os
+import time
 import logging
 from typing import Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Response, status
@@ -13,6 +14,7 @@ from prometheus_client import (
 )
 import redis
 from redis import Redis
+from redis.asyncio import ConnectionPool as AsyncConnectionPool, Redis as AsyncRedis
 from rq import Queue
 
 # Configure logging
@@ -27,25 +29,48 @@ metrics = {
     "fetched_ok": Counter("citation_fetched_ok_total", "Successfully fetched citations"),
     "fetched_err": Counter("citation_fetched_err_total", "Failed citation fetches"),
     "embedded_ok": Counter("citation_embedded_ok_total", "Successfully embedded citations"),
-    "size_bytes": Histogram("citation_size_bytes", "Size of fetched citations in bytes"),
+    # 1 KiB .. 16 MiB in 4x steps; the default buckets are sized for seconds
+    "size_bytes": Histogram(
+        "citation_size_bytes",
+        "Size of fetched citations in bytes",
+        buckets=tuple(1024 * 4 ** i for i in range(8))
+    ),
     "queue_depth": Gauge("citation_queue_depth", "Current depth of citation processing queue"),
 }
 
-# Global connections
+# Last formatted second, reused by every probe that lands within it
+_last_timestamp = [0, ""]
+
+
+def _iso_now() -> str:
+    """Current UTC time as ISO 8601, formatted at most once per second."""
+    now = int(time.time())
+    if now != _last_timestamp[0]:
+        _last_timestamp[:] = [now, datetime.fromtimestamp(now, timezone.utc).isoformat()]
+    return _last_timestamp[1]
+
+
+# Global connections: RQ needs the sync client, request handlers use the async pool
 redis_client: Redis = None
+async_redis: AsyncRedis = None
 rq_queue: Queue = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle."""
-    global redis_client, rq_queue
+    global redis_client, async_redis, rq_queue
     
     # Startup
     try:
         redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
         redis_client = redis.from_url(redis_url, decode_responses=True)
         rq_queue = Queue("citations", connection=redis_client)
+        async_redis = AsyncRedis(connection_pool=AsyncConnectionPool.from_url(
+            redis_url,
+            max_connections=64,
+            decode_responses=True
+        ))
         logger.info("Successfully connected to Redis and initialized RQ queue")
     except Exception as e:
         logger.error(f"Failed to initialize Redis/RQ: {e}")
@@ -54,6 +79,8 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    if async_redis:
+        await async_redis.aclose()
     if redis_client:
         redis_client.close()
         logger.info("Closed Redis connection")
@@ -80,15 +107,19 @@ app.add_middleware(
 async def health_check() -> Dict[str, Any]:
     """Health check endpoint for Kubernetes probes."""
     try:
-        # Check Redis connection
-        redis_status = "healthy" if redis_client and redis_client.ping() else "unhealthy"
+        # Check Redis connection without blocking the event loop
+        try:
+            redis_status = "healthy" if async_redis and await async_redis.ping() else "unhealthy"
+        except redis.RedisError as e:
+            logger.warning(f"Redis ping failed: {e}")
+            redis_status = "unhealthy"
         
-        # Check RQ queue
+        # Check RQ queue; its length is the LLEN of the queue's Redis list
         queue_status = "healthy"
         queue_size = 0
         if rq_queue:
             try:
-                queue_size = len(rq_queue)
+                queue_size = await async_redis.llen(rq_queue.key)
                 metrics["queue_depth"].set(queue_size)
             except Exception as e:
                 logger.warning(f"Failed to get queue size: {e}")
@@ -96,7 +127,7 @@ async def health_check() -> Dict[str, Any]:
         
         health_status = {
             "status": "healthy" if redis_status == "healthy" else "degraded",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _iso_now(),
             "checks": {
                 "redis": redis_status,
                 "rq_queue": queue_status,
@@ -111,7 +142,7 @@ async def health_check() -> Dict[str, Any]:
         logger.error(f"Health check failed: {e}")
         return {
             "status": "unhealthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _iso_now(),
             "error": str(e)
         }
 
@@ -2,37 +2,125 @@
 
 import os
 import re
+import atexit
 import base64
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Tuple
 
-import requests
+import httpx
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
 
 logger = logging.getLogger(__name__)
 
 # GitHub API configuration
 GITHUB_API_URL = "https://api.github.com"
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_URL}/graphql"
+# File bodies as raw bytes instead of base64 inside JSON
+RAW_MEDIA_TYPE = "application/vnd.github.v3.raw"
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")  # Optional, for rate limit
 
+# Conditional-request cache: ETag plus body per API URL
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+GITHUB_CACHE_TTL = int(os.getenv("GITHUB_CACHE_TTL", "86400"))
+
+# Per-request HTTP timeout, and the bound on a whole blocking fetch: the GraphQL attempt,
+# the REST listing and the file downloads are up to three request rounds, plus a margin
+HTTP_TIMEOUT = 10
+SYNC_FETCH_TIMEOUT = float(os.getenv("GITHUB_FETCH_TIMEOUT", str(HTTP_TIMEOUT * 3 + 5)))
+
+# Cap on in-flight API requests per fetcher, to stay clear of secondary rate limits
+ASYNC_CONCURRENCY = int(os.getenv("GITHUB_CONCURRENCY", "5"))
+
+# Description, README.md and docs/ blobs in one round trip (GraphQL requires a token)
+DOCS_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    name
+    description
+    readme: object(expression: "HEAD:README.md") { ... on Blob { text } }
+    docs: object(expression: "HEAD:docs") {
+      ... on Tree { entries { name type object { ... on Blob { text } } } }
+    }
+  }
+}
+"""
+
+
+def _json(response: httpx.Response) -> Any:
+    """Parse an API response body with orjson."""
+    return orjson.loads(response.content)
+
 
 class GitHubFetcher:
     """Fetch and process GitHub repository documentation."""
     
     def __init__(self, token: Optional[str] = GITHUB_TOKEN):
         self.token = token
-        self.session = requests.Session()
         
+        headers = {"Accept": "application/vnd.github.v3+json"}
         if token:
-            self.session.headers.update({
-                "Authorization": f"token {token}",
-                "Accept": "application/vnd.github.v3+json"
-            })
-        else:
-            self.session.headers.update({
-                "Accept": "application/vnd.github.v3+json"
-            })
-    
-    def fetch_repo_docs(
+            headers["Authorization"] = f"token {token}"
+        
+        # HTTP/2 multiplexes the concurrent API calls over one pooled connection
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers=headers,
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+        self._semaphore = asyncio.Semaphore(ASYNC_CONCURRENCY)
+        self._cache = aioredis.from_url(REDIS_URL)
+    
+    async def _get(self, url: str, accept: Optional[str] = None) -> httpx.Response:
+        """GET an API URL, revalidating any cached copy with If-None-Match."""
+        cache_key = f"gh:etag:{accept or 'json'}:{url}"
+        cached = {}
+        try:
+            cached = await self._cache.hgetall(cache_key)
+        except RedisError as e:
+            logger.debug(f"GitHub cache lookup failed for {url}: {e}")
+        
+        # A partial hash (eviction, interrupted write) can't be revalidated; treat it as a miss
+        if cached.get(b"etag") is None or b"body" not in cached or b"type" not in cached:
+            cached = {}
+        
+        headers = {"Accept": accept} if accept else {}
+        if cached:
+            headers["If-None-Match"] = cached[b"etag"].decode()
+        async with self._semaphore:
+            response = await self.client.get(url, headers=headers)
+        
+        # 304s carry no body; serve the cached one
+        if response.status_code == 304 and cached:
+            return httpx.Response(
+                200,
+                content=cached[b"body"],
+                headers={"Content-Type": cached[b"type"].decode()},
+                request=response.request
+            )
+        
+        etag = response.headers.get("ETag")
+        if response.status_code == 200 and etag:
+            try:
+                async with self._cache.pipeline(transaction=False) as pipe:
+                    pipe.hset(cache_key, mapping={
+                        "etag": etag,
+                        "type": response.headers.get("Content-Type", ""),
+                        "body": response.content
+                    })
+                    pipe.expire(cache_key, GITHUB_CACHE_TTL)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.debug(f"GitHub cache store failed for {url}: {e}")
+        
+        return response
+    
+    async def fetch_repo_docs(
         self,
         owner: str,
         repo: str,
@@ -42,42 +130,42 @@ class GitHubFetcher:
         docs = []
         title = f"{owner}/{repo}"
         
+        if not path and self.token:
+            result = await self._fetch_docs_graphql(owner, repo)
+            if result is not None:
+                return result
+        
         try:
-            # Fetch repository info
-            repo_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
-            repo_response = self.session.get(repo_url, timeout=10)
+            # Repository info and content requests are independent; issue them together
+            if path:
+                # If specific path provided, fetch that file
+                content_tasks = [self._fetch_file(owner, repo, path)]
+            else:
+                # Fetch README and docs directory
+                content_tasks = [
+                    self._fetch_readme(owner, repo),
+                    self._fetch_docs_directory(owner, repo)
+                ]
+            
+            repo_response, *contents = await asyncio.gather(
+                self._get(f"{GITHUB_API_URL}/repos/{owner}/{repo}"),
+                *content_tasks
+            )
             
             if repo_response.status_code == 200:
-                repo_data = repo_response.json()
+                repo_data = _json(repo_response)
                 title = repo_data.get("name", title)
                 description = repo_data.get("description", "")
                 if description:
                     docs.append(f"# {title}\n\n{description}\n\n")
             
-            # If specific path provided, fetch that file
-            if path:
-                file_content = self._fetch_file(owner, repo, path)
-                if file_content:
-                    docs.append(file_content)
-            else:
-                # Fetch README
-                readme_content = self._fetch_readme(owner, repo)
-                if readme_content:
-                    docs.append(readme_content)
-                
-                # Fetch docs directory
-                docs_content = self._fetch_docs_directory(owner, repo)
-                docs.extend(docs_content)
+            for content in contents:
+                if isinstance(content, list):
+                    docs.extend(content)
+                elif content:
+                    docs.append(content)
             
-            # Combine all documentation
-            combined_text = "\n\n---\n\n".join(docs) if docs else ""
-            
-            return {
-                "text": combined_text,
-                "title": title,
-                "files": len(docs),
-                "source": f"github.com/{owner}/{repo}"
-            }
+            return self._combine_docs(docs, title, owner, repo)
         
         except Exception as e:
             logger.error(f"Failed to fetch GitHub docs for {owner}/{repo}: {e}")
@@ -87,47 +175,126 @@ class GitHubFetcher:
                 "error": str(e)
             }
     
-    def _fetch_readme(self, owner: str, repo: str) -> Optional[str]:
+    @staticmethod
+    def _combine_docs(docs: List[str], title: str, owner: str, repo: str) -> Dict[str, Any]:
+        """Combine all documentation into the fetch result."""
+        combined_text = "\n\n---\n\n".join(docs) if docs else ""
+        
+        return {
+            "text": combined_text,
+            "title": title,
+            "files": len(docs),
+            "source": f"github.com/{owner}/{repo}"
+        }
+    
+    async def _fetch_docs_graphql(self, owner: str, repo: str) -> Optional[Dict[str, Any]]:
+        """Fetch description, README and docs in one GraphQL query, or None to fall back to REST."""
+        try:
+            async with self._semaphore:
+                response = await self.client.post(
+                    GITHUB_GRAPHQL_URL,
+                    json={"query": DOCS_QUERY, "variables": {"owner": owner, "name": repo}}
+                )
+            if response.status_code != 200:
+                return None
+            
+            payload = _json(response)
+            repo_data = (payload.get("data") or {}).get("repository")
+            if payload.get("errors") or not repo_data:
+                return None
+        except Exception as e:
+            logger.debug(f"GraphQL docs query failed for {owner}/{repo}: {e}")
+            return None
+        
+        docs = []
+        title = repo_data.get("name") or f"{owner}/{repo}"
+        description = repo_data.get("description")
+        if description:
+            docs.append(f"# {title}\n\n{description}\n\n")
+        
+        # Blob text arrives as UTF-8; only README variants other than README.md need REST
+        readme = (repo_data.get("readme") or {}).get("text")
+        if readme is None:
+            readme = await self._fetch_readme(owner, repo)
+        if readme:
+            docs.append(readme)
+        
+        # Filter for markdown and text files, up to 5 as with the REST listing
+        entries = (repo_data.get("docs") or {}).get("entries") or []
+        doc_files = [
+            entry for entry in entries
+            if entry.get("type") == "blob" and
+            (entry["name"].endswith(".md") or entry["name"].endswith(".txt"))
+        ]
+        for entry in doc_files[:5]:
+            text = (entry.get("object") or {}).get("text")
+            if text:
+                docs.append(f"# {entry['name']}\n\n{text}")
+        
+        return self._combine_docs(docs, title, owner, repo)
+    
+    @staticmethod
+    def _file_text(response: httpx.Response) -> Optional[str]:
+        """Text of a file requested as raw; anything that isn't a file comes back as JSON."""
+        if response.headers.get("Content-Type", "").startswith("application/json"):
+            data = _json(response)
+            if isinstance(data, dict) and data.get("type") == "file":
+                return base64.b64decode(data["content"]).decode("utf-8")
+            return None
+        
+        return response.content.decode("utf-8", errors="replace")
+    
+    async def _fetch_readme(self, owner: str, repo: str) -> Optional[str]:
         """Fetch repository README."""
         readme_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/readme"
         
         try:
-            response = self.session.get(readme_url, timeout=10)
+            response = await self._get(readme_url, accept=RAW_MEDIA_TYPE)
             if response.status_code == 200:
-                data = response.json()
-                content = base64.b64decode(data["content"]).decode("utf-8")
-                return content
+                return self._file_text(response)
         except Exception as e:
             logger.debug(f"No README found for {owner}/{repo}: {e}")
         
         return None
     
-    def _fetch_file(self, owner: str, repo: str, path: str) -> Optional[str]:
+    async def _fetch_file(self, owner: str, repo: str, path: str) -> Optional[str]:
         """Fetch specific file from repository."""
         file_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{path}"
         
         try:
-            response = self.session.get(file_url, timeout=10)
+            response = await self._get(file_url, accept=RAW_MEDIA_TYPE)
             if response.status_code == 200:
-                data = response.json()
+                content = self._file_text(response)
                 
-                if data.get("type") == "file":
-                    content = base64.b64decode(data["content"]).decode("utf-8")
+                if content is not None:
                     return f"# File: {path}\n\n{content}"
         except Exception as e:
             logger.debug(f"Failed to fetch file {path} from {owner}/{repo}: {e}")
         
         return None
     
-    def _fetch_docs_directory(self, owner: str, repo: str) -> List[str]:
+    async def _fetch_doc_file(self, file_info: Dict[str, Any]) -> Optional[str]:
+        """Fetch one file from a docs directory listing."""
+        try:
+            file_response = await self._get(file_info["url"], accept=RAW_MEDIA_TYPE)
+            if file_response.status_code == 200:
+                content = self._file_text(file_response)
+                if content is not None:
+                    return f"# {file_info['name']}\n\n{content}"
+        except Exception as e:
+            logger.debug(f"Failed to fetch doc file {file_info['name']}: {e}")
+        
+        return None
+    
+    async def _fetch_docs_directory(self, owner: str, repo: str) -> List[str]:
         """Fetch documentation from docs directory."""
         docs = []
         docs_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/docs"
         
         try:
-            response = self.session.get(docs_url, timeout=10)
+            response = await self._get(docs_url)
             if response.status_code == 200:
-                files = response.json()
+                files = _json(response)
                 
                 # Filter for markdown and text files
                 doc_files = [
@@ -136,22 +303,78 @@ class GitHubFetcher:
                     (f["name"].endswith(".md") or f["name"].endswith(".txt"))
                 ]
                 
-                # Fetch up to 5 doc files
-                for file_info in doc_files[:5]:
-                    try:
-                        file_response = self.session.get(file_info["url"], timeout=10)
-                        if file_response.status_code == 200:
-                            file_data = file_response.json()
-                            content = base64.b64decode(file_data["content"]).decode("utf-8")
-                            docs.append(f"# {file_info['name']}\n\n{content}")
-                    except Exception as e:
-                        logger.debug(f"Failed to fetch doc file {file_info['name']}: {e}")
+                # Fetch up to 5 doc files concurrently
+                contents = await asyncio.gather(
+                    *[self._fetch_doc_file(file_info) for file_info in doc_files[:5]]
+                )
+                docs = [content for content in contents if content]
         
         except Exception as e:
             logger.debug(f"No docs directory found for {owner}/{repo}: {e}")
         
         return docs
     
-    def close(self):
-        """Close session."""
-        self.session.close()
+    async def close(self):
+        """Close HTTP client and cache connection."""
+        await self.client.aclose()
+        await self._cache.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+# Process-wide fetcher on a background event loop, so sync callers share its
+# connection pool instead of paying a TLS handshake per call
+_SHARED: Optional[Tuple[asyncio.AbstractEventLoop, GitHubFetcher]] = None
+_SHARED_PID: Optional[int] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def _shared_fetcher() -> Tuple[asyncio.AbstractEventLoop, GitHubFetcher]:
+    """Return the shared event loop and fetcher, starting them on first use."""
+    global _SHARED, _SHARED_PID
+    
+    # A forked child (e.g. an RQ work horse) can't use the parent's loop thread
+    if _SHARED is None or _SHARED_PID != os.getpid():
+        with _SHARED_LOCK:
+            if _SHARED is None or _SHARED_PID != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="github-fetcher", daemon=True).start()
+                
+                async def _create() -> GitHubFetcher:
+                    return GitHubFetcher()
+                
+                fetcher = asyncio.run_coroutine_threadsafe(_create(), loop).result()
+                _SHARED = (loop, fetcher)
+                _SHARED_PID = os.getpid()
+    
+    return _SHARED
+
+
+@atexit.register
+def _close_shared_fetcher():
+    """Close the shared fetcher's connections and stop its loop."""
+    if _SHARED is None or _SHARED_PID != os.getpid():
+        return
+    
+    loop, fetcher = _SHARED
+    try:
+        asyncio.run_coroutine_threadsafe(fetcher.close(), loop).result(timeout=5)
+    except Exception as e:
+        logger.debug(f"Failed to close GitHub fetcher: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def fetch_repo_docs_sync(owner: str, repo: str, path: str = "") -> Dict[str, Any]:
+    """Blocking wrapper around GitHubFetcher.fetch_repo_docs for sync callers."""
+    loop, fetcher = _shared_fetcher()
+    future = asyncio.run_coroutine_threadsafe(fetcher.fetch_repo_docs(owner, repo, path), loop)
+    try:
+        return future.result(timeout=SYNC_FETCH_TIMEOUT)
+    except FutureTimeoutError:
+        # Stop the hung fetch on the shared loop rather than leaving it running
+        future.cancel()
+        raise TimeoutError(f"GitHub fetch for {owner}/{repo} exceeded {SYNC_FETCH_TIMEOUT}s")
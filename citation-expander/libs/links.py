@@ -3,20 +3,55 @@
 import os
 import re
 import logging
-from typing import List, Set
-from urllib.parse import urlparse, urljoin
+import threading
+from itertools import islice
+from typing import FrozenSet, Iterable, Iterator, List, Set, Tuple
+from urllib.parse import urlparse, urlsplit, urljoin
 
 import yaml
 
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Load allowlist patterns from environment or config
 ALLOWLIST_PATTERNS = None
+# Hosts from patterns that only pin the host, checked by set lookup
+ALLOWLIST_HOSTS: FrozenSet[str] = frozenset()
+# The remaining patterns, and those as one alternation so each URL is a single regex scan
+ALLOWLIST_RESIDUAL: List[re.Pattern] = []
+ALLOWLIST_COMBINED = None
+# Hyperscan database over the residual patterns, when the library is installed
+ALLOWLIST_HS_DB = None
+# Hyperscan scratch space is not thread-safe; each thread scanning gets its own
+_HS_LOCAL = threading.local()
+
+# "^https?://(www\.)?example\.com/" with a literal host and nothing after the slash
+_HOST_PATTERN_RE = re.compile(r"^\^https\?://(\(www\\\.\)\?)?((?:[a-z0-9-]+\\\.)+[a-z]+)/$", re.IGNORECASE)
+
+# Regex patterns for different link formats; the URL is the last group, or the whole match
+LINK_PATTERNS = (
+    # Standard URLs
+    re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+', re.IGNORECASE),
+    # Markdown links
+    re.compile(r'\[([^\]]+)\]\(([^)]+)\)', re.IGNORECASE),
+    # HTML links
+    re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE),
+    # Plain domain references
+    re.compile(r'(?:www\.)?[a-zA-Z0-9-]+\.[a-zA-Z]{2,}(?:/[^\s<>"{}|\\^`\[\]]*)?', re.IGNORECASE),
+)
+# The same formats as one alternation, so a single scan yields links in document order
+LINK_RE = re.compile("|".join(f"(?:{pattern.pattern})" for pattern in LINK_PATTERNS), re.IGNORECASE)
+MAX_LINKS = 50
 
 
 def load_allowlist_patterns() -> List[re.Pattern]:
     """Load URL allowlist patterns from ConfigMap or environment."""
-    global ALLOWLIST_PATTERNS
+    global ALLOWLIST_PATTERNS, ALLOWLIST_HOSTS, ALLOWLIST_RESIDUAL, ALLOWLIST_COMBINED, ALLOWLIST_HS_DB
     
     if ALLOWLIST_PATTERNS is not None:
         return ALLOWLIST_PATTERNS
@@ -69,10 +104,64 @@ def load_allowlist_patterns() -> List[re.Pattern]:
         
         logger.info(f"Using {len(patterns)} default allowlist patterns")
     
+    ALLOWLIST_HOSTS, residual = _split_host_patterns(patterns)
+    ALLOWLIST_RESIDUAL = residual
+    
+    if residual:
+        try:
+            ALLOWLIST_COMBINED = re.compile(
+                "|".join(f"(?:{pattern.pattern})" for pattern in residual),
+                re.IGNORECASE
+            )
+        except re.error as e:
+            # e.g. inline global flags in a configured pattern; check one by one
+            logger.warning(f"Could not combine allowlist patterns: {e}")
+    
+    if residual and HYPERSCAN_AVAILABLE:
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[pattern.pattern.encode() for pattern in residual],
+                ids=list(range(len(residual))),
+                flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(residual)
+            )
+            ALLOWLIST_HS_DB = db
+        except hyperscan.error as e:
+            # Unsupported constructs (backreferences, lookarounds); stay on re
+            logger.warning(f"Could not compile allowlist for Hyperscan: {e}")
+    
     ALLOWLIST_PATTERNS = patterns
     return patterns
 
 
+def _split_host_patterns(patterns: List[re.Pattern]) -> Tuple[FrozenSet[str], List[re.Pattern]]:
+    """Separate exact-host patterns into a host set; return it with the other patterns."""
+    hosts = set()
+    residual = []
+    
+    for pattern in patterns:
+        match = _HOST_PATTERN_RE.match(pattern.pattern)
+        if not match:
+            residual.append(pattern)
+            continue
+        
+        host = match.group(2).replace("\\.", ".").lower()
+        hosts.add(host)
+        if match.group(1):
+            hosts.add(f"www.{host}")
+    
+    return frozenset(hosts), residual
+
+
+def _hs_scratch():
+    """Return this thread's Hyperscan scratch for the allowlist database."""
+    scratch = getattr(_HS_LOCAL, "scratch", None)
+    if scratch is None:
+        scratch = hyperscan.Scratch(ALLOWLIST_HS_DB)
+        _HS_LOCAL.scratch = scratch
+    return scratch
+
+
 def is_url_allowed(url: str) -> bool:
     """Check if URL matches allowlist patterns."""
     patterns = load_allowlist_patterns()
@@ -81,69 +170,118 @@ def is_url_allowed(url: str) -> bool:
     if not patterns:
         return True
     
-    # Check if URL matches any pattern
-    for pattern in patterns:
+    # Most patterns only pin the host; same match as the regex, without running it
+    if ALLOWLIST_HOSTS:
+        try:
+            parts = urlsplit(url)
+            if (parts.scheme in ("http", "https") and parts.path.startswith("/")
+                    and parts.netloc.lower() in ALLOWLIST_HOSTS):
+                return True
+        except ValueError:
+            pass
+    
+    if ALLOWLIST_HS_DB is not None:
+        matched = False
+        
+        def on_match(pattern_id, start, end, flags, context):
+            nonlocal matched
+            matched = True
+        
+        ALLOWLIST_HS_DB.scan(url.encode(), match_event_handler=on_match, scratch=_hs_scratch())
+        return matched
+    
+    if ALLOWLIST_COMBINED is not None:
+        return ALLOWLIST_COMBINED.search(url) is not None
+    
+    # Check if URL matches any remaining pattern
+    for pattern in ALLOWLIST_RESIDUAL:
         if pattern.search(url):
             return True
     
     return False
 
 
+def _iter_links(text: str, base_url: str) -> Iterator[str]:
+    """Yield each distinct allowed link in document order."""
+    seen: Set[str] = set()
+    links: Set[str] = {base_url}  # Filter out the base URL itself
+    
+    for m in LINK_RE.finditer(text):
+        # Markdown and HTML links capture the URL in their last group
+        match = m.group(m.lastindex or 0)
+        
+        # Pages repeat the same links (nav, footers); validate each distinct match once
+        if match in seen:
+            continue
+        seen.add(match)
+        
+        # Clean and validate URL
+        url = match.strip().rstrip(".,;:'\"")
+        
+        # Add protocol if missing
+        if not url.startswith(("http://", "https://", "//")):
+            if url.startswith("www."):
+                url = f"https://{url}"
+            elif "." in url and not url.startswith("/"):
+                url = f"https://{url}"
+        
+        # Make relative URLs absolute
+        if url.startswith("/"):
+            url = urljoin(base_url, url)
+        
+        # Skip repeats after normalization and anything that still has no scheme
+        if url in links or "://" not in url:
+            continue
+        
+        # Validate URL
+        try:
+            parsed = urlparse(url)
+            if parsed.scheme in ["http", "https"] and parsed.netloc:
+                # Check if allowed
+                if is_url_allowed(url):
+                    links.add(url)
+                    yield url
+        except Exception:
+            continue
+
+
 def extract_links(text: str, base_url: str) -> List[str]:
     """Extract unique links from text content."""
     if not text:
         return []
     
-    links: Set[str] = set()
-    
-    # Regex patterns for different link formats
-    patterns = [
-        # Standard URLs
-        r'https?://[^\s<>"{}|\\^`\[\]]+',
-        # Markdown links
-        r'\[([^\]]+)\]\(([^)]+)\)',
-        # HTML links
-        r'href=["\']([^"\']+)["\']',
-        # Plain domain references
-        r'(?:www\.)?[a-zA-Z0-9-]+\.[a-zA-Z]{2,}(?:/[^\s<>"{}|\\^`\[\]]*)?'
-    ]
+    # Stop scanning once enough links are found, then sort for consistency
+    return sorted(islice(_iter_links(text, base_url), MAX_LINKS))
+
+
+def _iter_hrefs(hrefs: Iterable[str], base_url: str) -> Iterator[str]:
+    """Yield each distinct allowed link among anchor hrefs, in document order."""
+    links: Set[str] = {base_url}  # Filter out the base URL itself
     
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        for match in matches:
-            # Handle tuple results from markdown pattern
-            if isinstance(match, tuple):
-                match = match[1] if len(match) > 1 else match[0]
-            
-            # Clean and validate URL
-            url = match.strip().rstrip(".,;:'\"")
-            
-            # Add protocol if missing
-            if not url.startswith(("http://", "https://", "//")):
-                if url.startswith("www."):
-                    url = f"https://{url}"
-                elif "." in url and not url.startswith("/"):
-                    url = f"https://{url}"
-            
-            # Make relative URLs absolute
-            if url.startswith("/"):
-                url = urljoin(base_url, url)
-            
-            # Validate URL
-            try:
-                parsed = urlparse(url)
-                if parsed.scheme in ["http", "https"] and parsed.netloc:
-                    # Check if allowed
-                    if is_url_allowed(url):
-                        links.add(url)
-            except Exception:
-                continue
-    
-    # Filter out the base URL itself
-    links.discard(base_url)
-    
-    # Sort for consistency
-    return sorted(list(links))[:50]  # Limit to 50 links
+    for href in hrefs:
+        href = href.strip()
+        # In-page anchors point back at the page
+        if not href or href.startswith("#"):
+            continue
+        
+        url = urljoin(base_url, href)
+        if url in links:
+            continue
+        
+        try:
+            parsed = urlparse(url)
+            if parsed.scheme in ["http", "https"] and parsed.netloc:
+                if is_url_allowed(url):
+                    links.add(url)
+                    yield url
+        except Exception:
+            continue
+
+
+def extract_href_links(hrefs: Iterable[str], base_url: str) -> List[str]:
+    """Extract unique links from the anchor hrefs of an already parsed page, in document order."""
+    # Order matters: callers crawl the first few, and earlier links sit closer to the page's lead
+    return list(islice(_iter_hrefs(hrefs, base_url), MAX_LINKS))
 
 
 def extract_github_repo_info(url: str) -> dict:
@@ -1,47 +1,95 @@
 """Content normalization utilities for different formats."""
 
 import re
+import html
 import logging
 from typing import Dict, Any, Optional
 from urllib.parse import urlparse
 
-import trafilatura
-from bs4 import BeautifulSoup
-import markdown
-
-from libs.github import GitHubFetcher
+from libs.github import fetch_repo_docs_sync
+from libs.links import extract_href_links, extract_links
 from libs.pdf import PDFParser
 
 logger = logging.getLogger(__name__)
 
+# Control characters that are not whitespace (\s also covers \x0b, \x0c and \x1c-\x1f)
+_CLEAN_TABLE = dict.fromkeys([*range(0x00, 0x09), *range(0x0E, 0x1C), 0x7F])
+_CLEAN_TABLE.update({
+    ord('\u201c'): '"', ord('\u201d'): '"',
+    ord('\u2018'): "'", ord('\u2019'): "'",
+})
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Page chrome whose anchors (menus, footers, sidebars) are not citations
+_BOILERPLATE_TAGS = ["nav", "header", "footer", "aside"]
+
+# Anything that could render differently from plain text
+_MARKDOWN_SYNTAX_RE = re.compile(r'[#*_`\[>|<&\\~]|^\s*(?:[-+]|\d+\.)\s', re.MULTILINE)
+
+# Markdown constructs reduced to their text, applied in order
+_MARKDOWN_STRIP = [
+    # Code fence lines (the code itself is kept)
+    (re.compile(r'^\s*(?:```|~~~).*$', re.MULTILINE), ''),
+    # Horizontal rules and table separator rows
+    (re.compile(r'^\s*([-*_])(?:\s*\1){2,}\s*$', re.MULTILINE), ''),
+    (re.compile(r'^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)+\|?\s*$', re.MULTILINE), ''),
+    # Reference link definitions, images, then links keeping their label
+    (re.compile(r'^\s{0,3}\[[^\]]+\]:\s*\S.*$', re.MULTILINE), ''),
+    (re.compile(r'!\[[^\]]*\]\([^)]*\)'), ''),
+    (re.compile(r'\[([^\]]+)\](?:\([^)]*\)|\[[^\]]*\])'), r'\1'),
+    # Headings, blockquotes and list markers
+    (re.compile(r'^\s{0,3}#{1,6}\s+|\s+#+\s*$', re.MULTILINE), ''),
+    (re.compile(r'^\s{0,3}>\s?', re.MULTILINE), ''),
+    (re.compile(r'^\s*(?:[-*+]|\d+\.)\s+', re.MULTILINE), ''),
+    # Table cell borders
+    (re.compile(r'^\s*\||\|\s*$|\s\|\s', re.MULTILINE), ' '),
+    # Inline code, emphasis and strikethrough
+    (re.compile(r'`+([^`]*)`+'), r'\1'),
+    (re.compile(r'(?<![\w\\])(\*{1,3}|_{1,3}|~~)(?=\S)(.+?)(?<![\s\\])\1(?!\w)'), r'\2'),
+    # Inline HTML tags and backslash escapes
+    (re.compile(r'<[^>\n]+>'), ''),
+    (re.compile(r'\\([\\`*_{}\[\]()#+\-.!|>~])'), r'\1'),
+]
+
 
 def clean_text(text: str) -> str:
     """Clean and normalize text content."""
     if not text:
         return ""
     
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Remove special characters but keep punctuation
-    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    # Remove special characters but keep punctuation, and normalize quotes
+    text = text.translate(_CLEAN_TABLE)
     
-    # Normalize quotes
-    text = text.replace('"', '"').replace('"', '"')
-    text = text.replace(''', "'").replace(''', "'")
-    
-    # Remove duplicate spaces
-    text = re.sub(r' +', ' ', text)
+    # Collapse whitespace runs to a single space
+    text = _WHITESPACE_RE.sub(' ', text)
     
     return text.strip()
 
 
 def normalize_html(content: bytes, url: str) -> Dict[str, Any]:
     """Normalize HTML content using trafilatura for readability."""
+    # Heavy parsers load on first HTML document, not at worker start
+    import trafilatura
+    from bs4 import BeautifulSoup
+    
     try:
         # Decode content
         text_content = content.decode('utf-8', errors='ignore')
         
+        # Parse once with the C-backed lxml parser; the tree serves title and fallback
+        soup = BeautifulSoup(text_content, 'lxml')
+        title = soup.find('title')
+        title_text = title.get_text() if title else None
+        
+        # Collect content links from the same tree instead of re-scanning the extracted text
+        links = extract_href_links(
+            (
+                anchor["href"] for anchor in soup.find_all("a", href=True)
+                if anchor.find_parent(_BOILERPLATE_TAGS) is None
+            ),
+            url
+        )
+        
         # Extract main content with trafilatura
         extracted = trafilatura.extract(
             text_content,
@@ -49,30 +97,23 @@ def normalize_html(content: bytes, url: str) -> Dict[str, Any]:
             include_tables=True,
             include_links=True,
             deduplicate=True,
+            no_fallback=True,
             url=url
         )
         
         if not extracted:
             # Fallback to BeautifulSoup
-            soup = BeautifulSoup(text_content, 'html.parser')
-            
             # Remove script and style elements
             for element in soup(['script', 'style', 'meta', 'link']):
                 element.decompose()
             
-            # Get title
-            title = soup.find('title')
-            title_text = title.get_text() if title else None
-            
             # Get text
             text = soup.get_text(separator=' ', strip=True)
         else:
             text = extracted
-            
-            # Try to get title from HTML
-            soup = BeautifulSoup(text_content, 'html.parser')
-            title = soup.find('title')
-            title_text = title.get_text() if title else None
+        
+        # Free the tree now rather than at garbage collection
+        soup.decompose()
         
         # Clean text
         text = clean_text(text)
@@ -80,6 +121,7 @@ def normalize_html(content: bytes, url: str) -> Dict[str, Any]:
         return {
             "text": text,
             "title": title_text,
+            "links": links,
             "content_type": "text/html",
             "source_url": url
         }
@@ -108,15 +150,12 @@ def normalize_markdown(content: bytes, url: str) -> Dict[str, Any]:
                 title = line[2:].strip()
                 break
         
-        # Convert markdown to HTML then to text
-        html = markdown.markdown(
-            text_content,
-            extensions=['extra', 'codehilite', 'tables']
-        )
-        
-        # Parse HTML to get clean text
-        soup = BeautifulSoup(html, 'html.parser')
-        text = soup.get_text(separator=' ', strip=True)
+        # Strip markdown syntax directly rather than rendering to HTML and back
+        text = text_content
+        if _MARKDOWN_SYNTAX_RE.search(text):
+            for pattern, replacement in _MARKDOWN_STRIP:
+                text = pattern.sub(replacement, text)
+            text = html.unescape(text)
         
         # Clean text
         text = clean_text(text)
@@ -125,7 +164,9 @@ def normalize_markdown(content: bytes, url: str) -> Dict[str, Any]:
             "text": text,
             "title": title,
             "content_type": "text/markdown",
-            "source_url": url
+            "source_url": url,
+            # Link targets are stripped from the text, so scan the source for them
+            "links": extract_links(text_content, url)
         }
     
     except Exception as e:
@@ -172,14 +213,18 @@ def normalize_pdf(content: bytes, url: str) -> Dict[str, Any]:
     """Normalize PDF content using PyMuPDF."""
     try:
         parser = PDFParser()
-        result = parser.parse(content)
+        info: Dict[str, Any] = {}
+        
+        # Clean page by page so only one page's raw text is held at a time
+        pages = (clean_text(page) for page in parser.parse_streaming(content, info))
+        text = " ".join(page for page in pages if page)
         
         return {
-            "text": clean_text(result["text"]),
-            "title": result.get("title"),
+            "text": text,
+            "title": info.get("title"),
             "content_type": "application/pdf",
             "source_url": url,
-            "metadata": result.get("metadata", {})
+            "metadata": info.get("metadata", {})
         }
     
     except Exception as e:
@@ -202,8 +247,7 @@ def normalize_github(content: bytes, url: str) -> Dict[str, Any]:
             # Fallback to HTML normalization
             return normalize_html(content, url)
         
-        fetcher = GitHubFetcher()
-        result = fetcher.fetch_repo_docs(
+        result = fetch_repo_docs_sync(
             repo_info["owner"],
             repo_info["repo"],
             repo_info.get("path", "")
@@ -1,18 +1,21 @@
 """PDF content parser using PyMuPDF."""
 
-import io
+import os
 import logging
-from typing import Dict, Any
+import importlib.util
+from typing import Dict, Any, Iterator, Optional
 
-try:
-    import fitz  # PyMuPDF
-    PYMUPDF_AVAILABLE = True
-except ImportError:
-    PYMUPDF_AVAILABLE = False
+# Checked without importing; PyMuPDF itself loads on the first PDF
+PYMUPDF_AVAILABLE = importlib.util.find_spec("fitz") is not None
+if not PYMUPDF_AVAILABLE:
     logging.warning("PyMuPDF not available, PDF parsing will be limited")
 
 logger = logging.getLogger(__name__)
 
+# Only the first pages are extracted, up to a cap on total characters
+MAX_PAGES = 50
+MAX_TEXT_CHARS = int(os.getenv("PDF_MAX_TEXT_CHARS", "2000000"))
+
 
 class PDFParser:
     """Parse PDF documents to extract text content."""
@@ -21,39 +24,55 @@ class PDFParser:
         if not PYMUPDF_AVAILABLE:
             raise ImportError("PyMuPDF is required for PDF parsing. Install with: pip install PyMuPDF")
     
+    def parse_streaming(
+        self,
+        content: bytes,
+        info: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """Yield the text of each non-empty page, filling info with title and metadata."""
+        import fitz  # PyMuPDF
+        
+        info = {} if info is None else info
+        
+        # Open the bytes directly, without an intermediate BytesIO copy
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            # Extract metadata
+            metadata = doc.metadata or {}
+            page_count = len(doc)
+            info["title"] = metadata.get("title", None)
+            info["metadata"] = {
+                "author": metadata.get("author", None),
+                "pages": page_count,
+                "extracted_pages": 0
+            }
+            
+            # Extract text from the leading pages; a Document must stay on one thread
+            total_chars = 0
+            for page in doc.pages(0, min(page_count, MAX_PAGES)):
+                text = page.get_text("text")
+                if not text.strip():
+                    continue
+                
+                info["metadata"]["extracted_pages"] += 1
+                yield text
+                
+                # Stop early once enough text has been produced
+                total_chars += len(text)
+                if total_chars >= MAX_TEXT_CHARS:
+                    break
+    
     def parse(self, content: bytes) -> Dict[str, Any]:
         """Parse PDF content and extract text."""
         try:
-            # Create PDF document from bytes
-            pdf_file = io.BytesIO(content)
-            doc = fitz.open(stream=pdf_file, filetype="pdf")
-            
-            # Extract metadata
-            metadata = doc.metadata
-            title = metadata.get("title", None)
-            author = metadata.get("author", None)
-            
-            # Extract text from all pages
-            text_pages = []
-            for page_num in range(min(len(doc), 50)):  # Limit to first 50 pages
-                page = doc[page_num]
-                text = page.get_text()
-                if text.strip():
-                    text_pages.append(text)
-            
-            doc.close()
+            info: Dict[str, Any] = {}
             
             # Combine text
-            full_text = "\n\n".join(text_pages)
+            full_text = "\n\n".join(self.parse_streaming(content, info))
             
             return {
                 "text": full_text,
-                "title": title,
-                "metadata": {
-                    "author": author,
-                    "pages": len(doc),
-                    "extracted_pages": len(text_pages)
-                }
+                "title": info["title"],
+                "metadata": info["metadata"]
             }
         
         except Exception as e:
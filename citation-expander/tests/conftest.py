@@ -144,12 +144,15 @@ def mock_requests():
         response.headers = {"Content-Type": "text/html"}
         response.url = "https://example.com"
         response.json.return_value = {"result": []}
+        response.__enter__.return_value = response
         
         session.get.return_value = response
         session.post.return_value = response
         mock.return_value = session
         
-        yield session
+        # Jobs fetch through a session created at import time
+        with patch("worker.jobs._HTTP_SESSION", session):
+            yield session
 
 
 @pytest.fixture
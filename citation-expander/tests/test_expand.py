@@ -4,8 +4,14 @@ import pytest
 from unittest.mock import patch, MagicMock
 import time
 
+import orjson
+import redis
+from qdrant_client.http.models import ScoredPoint
+
 from ask_maas_orchestrator_patch.expand import (
     expand_context,
+    embed_query,
+    _pack_embedding,
     search_citations_vectordb,
     rerank_results,
     get_chunk_links,
@@ -38,10 +44,13 @@ def test_format_citation_snippet():
 @patch("ask_maas_orchestrator_patch.expand.redis_client")
 def test_get_chunk_links(mock_redis):
     """Test loading chunk links from Redis."""
-    mock_redis.hgetall.return_value = {
-        "urls": "https://example1.com,https://example2.com",
-        "parent_chunk_id": "chunk-001"
-    }
+    mock_redis.pipeline.return_value.execute.return_value = [
+        {
+            "urls": "https://example1.com,https://example2.com",
+            "parent_chunk_id": "chunk-001"
+        },
+        {}
+    ]
     
     links = get_chunk_links(["chunk-001", "chunk-002"])
     
@@ -50,26 +59,48 @@ def test_get_chunk_links(mock_redis):
     assert "https://example1.com" in links["chunk-001"]
 
 
-@patch("requests.post")
-def test_search_citations_vectordb(mock_post):
+@patch("ask_maas_orchestrator_patch.expand._HTTP.post")
+@patch("ask_maas_orchestrator_patch.expand.redis_client")
+def test_embed_query_cache_hit(mock_redis, mock_post):
+    """Test that cached query embeddings skip the TEI call."""
+    vector = [0.25, -0.5, 1.0]
+    mock_redis.get.return_value = _pack_embedding(vector).decode()
+    
+    assert embed_query("test query") == pytest.approx(vector, abs=1 / 127)
+    mock_post.assert_not_called()
+
+
+@patch("ask_maas_orchestrator_patch.expand._HTTP.post")
+@patch("ask_maas_orchestrator_patch.expand.redis_client")
+def test_embed_query_cache_miss_matches_hit(mock_redis, mock_post):
+    """Test that a cache miss returns the same quantized vector a later hit would."""
+    mock_redis.get.return_value = None
+    mock_post.return_value = MagicMock(content=orjson.dumps([[0.3, -0.7, 0.9]]))
+    
+    embedding = embed_query("test query")
+    
+    packed = mock_redis.setex.call_args.args[2]
+    mock_redis.get.return_value = packed.decode()
+    assert embed_query("test query") == embedding
+
+
+@patch("ask_maas_orchestrator_patch.expand._QDRANT")
+@patch("ask_maas_orchestrator_patch.expand.embed_query")
+def test_search_citations_vectordb(mock_embed, mock_qdrant):
     """Test searching citations in vector database."""
-    # Mock TEI embedding response
-    mock_post.return_value.status_code = 200
-    mock_post.return_value.json.side_effect = [
-        [[0.1] * 768],  # Embedding response
-        {
-            "result": [
-                {
-                    "id": "citation-001",
-                    "score": 0.95,
-                    "payload": {
-                        "text_preview": "Test citation",
-                        "source_url": "https://example.com",
-                        "title": "Example"
-                    }
-                }
-            ]
-        }
+    # Mock query embedding and Qdrant search response
+    mock_embed.return_value = [0.1] * 768
+    mock_qdrant.search.return_value = [
+        ScoredPoint(
+            id="citation-001",
+            version=0,
+            score=0.95,
+            payload={
+                "text_preview": "Test citation",
+                "source_url": "https://example.com",
+                "title": "Example"
+            }
+        )
     ]
     
     results = search_citations_vectordb(
@@ -83,7 +114,7 @@ def test_search_citations_vectordb(mock_post):
     assert results[0]["score"] == 0.95
 
 
-@patch("requests.post")
+@patch("ask_maas_orchestrator_patch.expand._HTTP.post")
 def test_rerank_results(mock_post):
     """Test result reranking."""
     documents = [
@@ -93,11 +124,11 @@ def test_rerank_results(mock_post):
     ]
     
     mock_post.return_value.status_code = 200
-    mock_post.return_value.json.return_value = [
+    mock_post.return_value.content = orjson.dumps([
         {"score": 0.6},
         {"score": 0.95},
         {"score": 0.4}
-    ]
+    ])
     
     reranked = rerank_results("query", documents)
     
@@ -174,6 +205,39 @@ def test_expand_context_enqueue_missing(
     mock_enqueue.assert_called()
 
 
+@patch("ask_maas_orchestrator_patch.expand.search_citations_vectordb")
+@patch("ask_maas_orchestrator_patch.expand.get_chunk_links")
+@patch("ask_maas_orchestrator_patch.expand.redis_client")
+def test_expand_context_links_failure_keeps_citations(
+    mock_redis,
+    mock_get_links,
+    mock_search,
+    sample_chunks
+):
+    """Test that a failed link lookup still returns the citations found."""
+    mock_get_links.side_effect = redis.ConnectionError("redis down")
+    
+    mock_search.return_value = [
+        {
+            "id": "citation-001",
+            "score": 0.95,
+            "text": "Citation content about MaaS",
+            "source_url": "https://github.com/test",
+            "title": "MaaS Documentation"
+        }
+    ]
+    
+    snippets, metadata = expand_context(
+        query="What is MaaS?",
+        base_chunks=sample_chunks,
+        timeout_ms=800
+    )
+    
+    assert len(snippets) == 1
+    assert metadata["citations_found"] == 1
+    assert metadata["urls_enqueued"] == 0
+
+
 def test_expand_context_timeout(sample_chunks):
     """Test context expansion with timeout."""
     with patch("ask_maas_orchestrator_patch.expand.search_citations_vectordb") as mock_search:
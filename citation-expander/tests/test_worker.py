@@ -7,9 +7,11 @@ from worker.jobs import (
     canonicalize_url,
     fetch_url,
     parse_normalize,
+    chunk_text,
     embed_upsert,
     fetch_and_process_citation
 )
+from libs.normalizers import normalize_markdown
 
 
 def test_canonicalize_url():
@@ -63,6 +65,21 @@ def test_parse_normalize_html(sample_html_content):
     assert len(result["links"]) > 0
 
 
+def test_parse_normalize_html_content_links():
+    """Test that HTML links skip page chrome and keep document order."""
+    html = b"""
+    <html><body>
+    <nav><a href="https://github.com/nav/menu">Menu</a></nav>
+    <p>See <a href="https://github.com/zeta/repo">Zeta</a> and <a href="https://github.com/alpha/repo">Alpha</a></p>
+    <footer><a href="https://github.com/footer/links">Footer</a></footer>
+    </body></html>
+    """
+    
+    result = parse_normalize(html, "text/html", "https://example.com")
+    
+    assert result["links"] == ["https://github.com/zeta/repo", "https://github.com/alpha/repo"]
+
+
 def test_parse_normalize_markdown(sample_markdown_content):
     """Test Markdown parsing and normalization."""
     result = parse_normalize(
@@ -77,12 +94,76 @@ def test_parse_normalize_markdown(sample_markdown_content):
     assert any("github.com" in link for link in result["links"])
 
 
-@patch("worker.jobs.embed_text")
-@patch("worker.jobs.upsert_to_qdrant")
+@pytest.mark.parametrize("markdown,expected", [
+    ("# Title\n\n## Sub heading ##\nBody", "Title Sub heading Body"),
+    (
+        "Some *em*, **strong**, ___both___ and ~~gone~~ but snake_case_name stays",
+        "Some em, strong, both and gone but snake_case_name stays"
+    ),
+    (
+        'See [the docs](https://docs.example.com "t") and [ref][1].\n\n[1]: https://ref.example.com',
+        "See the docs and ref."
+    ),
+    ("Logo ![alt text](img.png) here", "Logo here"),
+    ("Intro\n\n```python\nprint(1)\n```\nOutro", "Intro print(1) Outro"),
+    ("- one\n* two\n+ three\n1. first\n2. second", "one two three first second"),
+    ("Tom &amp; Jerry &lt;3 &#169; &quot;q&quot;", 'Tom & Jerry <3 \u00a9 "q"'),
+    ("Use `kubectl get` and \\*literal\\*", "Use kubectl get and *literal*"),
+    ("> quoted line\n\n---\n\n| a | b |\n|---|---|\n| 1 | 2 |", "quoted line a b 1 2"),
+])
+def test_normalize_markdown_strips_syntax(markdown, expected):
+    """Test Markdown constructs are reduced to their text."""
+    result = normalize_markdown(markdown.encode(), "https://example.com/doc.md")
+    
+    assert result["text"] == expected
+
+
+def test_normalize_markdown_keeps_link_targets():
+    """Test link targets stripped from the text are still returned as links."""
+    result = normalize_markdown(
+        b"See [the docs](https://docs.example.com/guide) and [ref][1].\n\n[1]: https://docs.example.com/reference",
+        "https://example.com/doc.md"
+    )
+    
+    assert "https://docs.example.com/guide" not in result["text"]
+    assert "https://docs.example.com/guide" in result["links"]
+    assert "https://docs.example.com/reference" in result["links"]
+
+
+@pytest.mark.parametrize("text,expected", [
+    (
+        "First paragraph has some words.\n\nSecond paragraph follows here\n\nThird one",
+        ["First paragraph has some words", "words.\n\nSecond paragraph follo", "follows here\n\nThird one"]
+    ),
+    (
+        "One short sentence. Another sentence here! A question? Last words trail on and on",
+        ["One short sentence.", "ence. Another sentence here!", "here! A question?", "tion? Last words trail on and ", " and on"]
+    ),
+    (
+        "abcdefghijklmnopqrstuvwxyz" * 3,
+        ["abcdefghijklmnopqrstuvwxyzabcd", "zabcdefghijklmnopqrstuvwxyzabc", "yzabcdefghijklmnopqrstuvwxyz"]
+    ),
+    (
+        "line one\nline two\n\n\nline three\nline four\nline five",
+        ["line one\nline two\n", " two\n\n\nline three\nline four", " four\nline five"]
+    ),
+])
+def test_chunk_text_boundaries(text, expected):
+    """Test chunk boundaries match the rfind-based splitter's output."""
+    assert chunk_text(text, max_length=30, overlap=5) == expected
+
+
+def test_chunk_text_short_text():
+    """Test text within the limit is returned as a single chunk."""
+    assert chunk_text("Short text.", max_length=30) == ["Short text."]
+
+
+@patch("worker.jobs.embed_texts")
+@patch("worker.jobs.upsert_batch_to_qdrant")
 def test_embed_upsert(mock_upsert, mock_embed, mock_redis):
     """Test embedding and upserting."""
-    mock_embed.return_value = [0.1] * 768
-    mock_upsert.return_value = {"status": "success"}
+    mock_embed.return_value = [[0.1] * 768]
+    mock_upsert.return_value = [{"status": "success", "citation_id": "test-id"}]
     
     result = embed_upsert(
         text="Test content",
@@ -137,3 +218,153 @@ def test_fetch_and_process_citation(
     mock_fetch.assert_called_once()
     mock_parse.assert_called_once()
     mock_embed_upsert.assert_called_once()
+
+
+@patch("worker.jobs.redis_client")
+@patch("worker.jobs.fetch_url")
+@patch("worker.jobs.parse_normalize")
+@patch("worker.jobs.embed_upsert")
+def test_fetch_and_process_citation_unstored_content_not_marked_seen(
+    mock_embed_upsert,
+    mock_parse,
+    mock_fetch,
+    mock_redis_client
+):
+    """Test that content whose upsert failed is not recorded as already embedded."""
+    mock_redis_client.exists.return_value = False
+    mock_fetch.return_value = {
+        "url": "https://example.com",
+        "content": b"Test content",
+        "content_hash": "abc123",
+        "content_type": "text/html"
+    }
+    mock_parse.return_value = {"text": "Parsed text", "title": "Test Title", "links": []}
+    mock_embed_upsert.return_value = {"status": "partial", "chunks_stored": 0}
+    
+    fetch_and_process_citation(
+        url="https://example.com",
+        parent_doc_id="doc-001",
+        parent_chunk_id="chunk-001"
+    )
+    
+    pipe = mock_redis_client.pipeline.return_value
+    written_keys = [call.args[0] for call in pipe.setex.call_args_list]
+    assert not any(key.startswith("content_seen:") for key in written_keys)
+    assert any(key.startswith("citation_processed:") for key in written_keys)
+
+
+@patch("worker.jobs.enqueue_child_citations")
+@patch("worker.jobs.redis_client")
+@patch("worker.jobs.fetch_url")
+@patch("worker.jobs.parse_normalize")
+@patch("worker.jobs.embed_upsert")
+def test_fetch_and_process_citation_children_only_from_stored_parent(
+    mock_embed_upsert,
+    mock_parse,
+    mock_fetch,
+    mock_redis_client,
+    mock_enqueue_children
+):
+    """Test that child links are enqueued only once the parent's chunks are stored."""
+    mock_redis_client.exists.return_value = False
+    mock_fetch.return_value = {
+        "url": "https://example.com",
+        "content": b"Test content",
+        "content_type": "text/html"
+    }
+    mock_parse.return_value = {
+        "text": "Parsed text",
+        "title": "Test Title",
+        "links": ["https://example.com/a", "https://example.com/b"]
+    }
+    
+    mock_embed_upsert.return_value = {"status": "partial", "chunks_stored": 0}
+    fetch_and_process_citation("https://example.com", "doc-001", "chunk-001")
+    mock_enqueue_children.assert_not_called()
+    
+    mock_embed_upsert.return_value = {"status": "success", "chunks_stored": 1}
+    fetch_and_process_citation("https://example.com", "doc-001", "chunk-001")
+    mock_enqueue_children.assert_called_once_with(
+        ["https://example.com/a", "https://example.com/b"], "doc-001", "chunk-001", 1
+    )
+
+
+@patch("worker.embeddings.get_cache_client")
+@patch("worker.embeddings.get_embedding_client")
+def test_embed_texts_retries_failed_batch(mock_get_client, mock_get_cache):
+    """Test that a failed TEI batch is retried one text at a time."""
+    from worker.embeddings import embed_texts, BATCH_SIZE
+    
+    mock_get_cache.return_value.mget.side_effect = lambda keys: [None] * len(keys)
+    
+    def embed_batch(texts):
+        if "bad" in texts:
+            raise Exception("batch failed")
+        return [[0.1] * 768 for _ in texts]
+    
+    def embed(text):
+        if text == "bad":
+            raise Exception("text failed")
+        return [0.2] * 768
+    
+    client = MagicMock()
+    client.embed_batch.side_effect = embed_batch
+    client.embed.side_effect = embed
+    mock_get_client.return_value = client
+    
+    texts = ["ok"] * BATCH_SIZE + ["bad", "ok"]
+    embeddings = embed_texts(texts)
+    
+    assert len(embeddings) == len(texts)
+    assert embeddings[0] == [0.1] * 768
+    assert embeddings[BATCH_SIZE] is None
+    assert embeddings[BATCH_SIZE + 1] == [0.2] * 768
+    assert client.embed_batch.call_count == 2
+
+
+@patch("worker.embeddings.get_cache_client")
+@patch("worker.embeddings.get_embedding_client")
+def test_embed_texts_uses_cache(mock_get_client, mock_get_cache):
+    """Test that cached embeddings skip TEI and new ones are cached."""
+    import numpy as np
+    from worker.embeddings import embed_texts
+    
+    cached = np.full(768, 0.5, dtype=np.float16).tobytes()
+    cache = mock_get_cache.return_value
+    cache.mget.return_value = [cached, None]
+    
+    client = MagicMock()
+    client.embed_batch.return_value = [[0.25] * 768]
+    mock_get_client.return_value = client
+    
+    embeddings = embed_texts(["seen", "new"])
+    
+    assert embeddings[0].dtype == np.float16
+    assert embeddings[0].tolist() == [0.5] * 768
+    assert embeddings[1] == [0.25] * 768
+    client.embed_batch.assert_called_once_with(["new"])
+    cache.pipeline.return_value.set.assert_called_once()
+
+
+@patch("worker.embeddings.QdrantClient")
+def test_cleanup_expired_removes_legacy_iso_expiries(mock_qdrant_client):
+    """Test that points with ISO-string expiries are swept once expired."""
+    from types import SimpleNamespace
+    from worker.embeddings import QdrantStorage
+    
+    client = mock_qdrant_client.return_value
+    client.scroll.side_effect = [
+        (
+            [
+                SimpleNamespace(id=1, payload={"ttl_expires_at": "2020-01-01T00:00:00"}),
+                SimpleNamespace(id=2, payload={"ttl_expires_at": "2999-01-01T00:00:00"})
+            ],
+            "next"
+        ),
+        ([SimpleNamespace(id=3, payload={})], None)
+    ]
+    
+    result = QdrantStorage().cleanup_expired()
+    
+    assert result["legacy_deleted_count"] == 1
+    assert client.delete.call_args.kwargs["points_selector"].points == [1]
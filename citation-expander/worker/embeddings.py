@@ -1,18 +1,25 @@
 """Embeddings and Vector Storage Integration."""
 
 import os
+import time
 import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
+import redis
 import requests
 import numpy as np
+import orjson
+import xxhash
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance, VectorParams, PointStruct,
-    Filter, FieldCondition, Range,
-    UpdateStatus
+    Filter, FieldCondition, Range, FilterSelector, PointIdsList,
+    UpdateStatus, HnswConfigDiff, ScalarQuantization,
+    ScalarQuantizationConfig, ScalarType, SearchParams,
+    QuantizationSearchParams, MatchAny, PayloadSchemaType
 )
 
 logger = logging.getLogger(__name__)
@@ -20,9 +27,24 @@ logger = logging.getLogger(__name__)
 # Configuration
 TEI_URL = os.getenv("TEI_URL", "http://tei-embeddings:8080")
 QDRANT_URL = os.getenv("QDRANT_URL", "http://qdrant:6333")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 COLLECTION_NAME = "ask-maas-citations"
 EMBEDDING_DIM = 768
 BATCH_SIZE = 32
+# TEI batches in flight at once per worker process
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+# Cached embeddings live as long as the citations they were computed for
+EMBEDDING_CACHE_TTL = int(os.getenv("CITATION_TTL_DAYS", "7")) * 86400
+# Payload fields used in filters, indexed so filtering doesn't scan every payload
+INDEXED_FIELDS = {
+    "source_url": PayloadSchemaType.KEYWORD,
+    "parent_chunk_id": PayloadSchemaType.KEYWORD,
+    "ttl_expires_at": PayloadSchemaType.INTEGER,
+}
+# Past this many URLs a server-side filter costs more than over-fetching and filtering locally
+MAX_FILTER_URLS = 500
+# Points scrolled per page when sweeping citations with ISO-string expiries
+LEGACY_SCROLL_LIMIT = 1000
 
 
 class EmbeddingClient:
@@ -30,24 +52,28 @@ class EmbeddingClient:
     
     def __init__(self, base_url: str = TEI_URL):
         self.base_url = base_url.rstrip("/")
+        self._embed_url = f"{self.base_url}/embed"
         self.session = requests.Session()
+        self.session.headers["Content-Type"] = "application/json"
     
-    def embed(self, text: str) -> List[float]:
+    def embed(self, text: str) -> np.ndarray:
         """Generate embedding for single text."""
         return self.embed_batch([text])[0]
     
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for batch of texts."""
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Generate a float16 (N, dim) embedding matrix for batch of texts."""
         try:
+            # orjson encodes and decodes the float arrays far faster than stdlib json
             response = self.session.post(
-                f"{self.base_url}/embed",
-                json={"inputs": texts},
+                self._embed_url,
+                data=orjson.dumps({"inputs": texts}),
                 timeout=30
             )
             response.raise_for_status()
             
-            result = response.json()
-            return result if isinstance(result[0], list) else [result]
+            result = orjson.loads(response.content)
+            # Half-precision halves in-memory and cached size; upcast only at Qdrant ingress
+            return np.asarray(result if isinstance(result[0], list) else [result], dtype=np.float16)
         
         except requests.exceptions.RequestException as e:
             logger.error(f"TEI embedding failed: {e}")
@@ -77,30 +103,63 @@ class QdrantStorage:
                 vectors_config=VectorParams(
                     size=EMBEDDING_DIM,
                     distance=Distance.COSINE
+                ),
+                # Denser graph for recall at 10k-1M citations; small collections are brute-forced
+                hnsw_config=HnswConfigDiff(m=32, ef_construct=256, full_scan_threshold=10_000),
+                # Full chunk text lives in the payload; keep it on disk, indexes stay in RAM
+                on_disk_payload=True,
+                # int8 copies kept in RAM for search; originals are used for rescoring
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True
+                    )
                 )
             )
             logger.info(f"Created Qdrant collection: {self.collection_name}")
+        
+        # Creating an existing index is a no-op, so older collections get them too
+        for field_name, field_schema in INDEXED_FIELDS.items():
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=field_schema
+            )
     
-    def upsert(
-        self,
+    @staticmethod
+    def _point(
         citation_id: str,
-        embedding: List[float],
+        embedding: np.ndarray,
         text: str,
-        metadata: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Upsert a citation to Qdrant."""
-        # Convert string ID to numeric hash for Qdrant
-        numeric_id = int(hashlib.sha256(citation_id.encode()).hexdigest()[:16], 16)
+        metadata: Dict[str, Any],
+        numeric_id: Optional[int] = None
+    ) -> PointStruct:
+        """Build the Qdrant point for a citation."""
+        # Qdrant point IDs are unsigned 64-bit ints; xxh3 yields one directly
+        if numeric_id is None:
+            numeric_id = xxhash.xxh3_64_intdigest(citation_id.encode())
         
-        point = PointStruct(
+        return PointStruct(
             id=numeric_id,
-            vector=embedding,
+            vector=embedding if isinstance(embedding, list) else np.asarray(embedding, dtype=np.float32).tolist(),
             payload={
                 **metadata,
                 "citation_id": citation_id,  # Store original ID in payload
                 "text": text[:10000]  # Limit text size in payload
             }
         )
+    
+    def upsert(
+        self,
+        citation_id: str,
+        embedding: np.ndarray,
+        text: str,
+        metadata: Dict[str, Any],
+        numeric_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Upsert a citation to Qdrant."""
+        point = self._point(citation_id, embedding, text, metadata, numeric_id)
         
         result = self.client.upsert(
             collection_name=self.collection_name,
@@ -111,39 +170,85 @@ class QdrantStorage:
             return {
                 "status": "success",
                 "citation_id": citation_id,
-                "numeric_id": numeric_id
+                "numeric_id": point.id
             }
         else:
             raise Exception(f"Qdrant upsert failed: {result}")
     
+    def upsert_batch(
+        self,
+        points: List[tuple],
+        wait: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Upsert (citation_id, embedding, text, metadata[, numeric_id]) tuples in one request."""
+        # Upcast the whole batch to float32 lists in one vectorized call, not row by row
+        vectors = np.stack([point[1] for point in points]).astype(np.float32).tolist() if points else []
+        structs = [
+            self._point(point[0], vector, *point[2:])
+            for point, vector in zip(points, vectors)
+        ]
+        
+        # Without wait, Qdrant acknowledges once the batch is queued for indexing
+        result = self.client.upsert(
+            collection_name=self.collection_name,
+            points=structs,
+            wait=wait
+        )
+        
+        if result.status not in (UpdateStatus.COMPLETED, UpdateStatus.ACKNOWLEDGED):
+            raise Exception(f"Qdrant upsert failed: {result}")
+        
+        return [
+            {
+                "status": "success",
+                "citation_id": point[0],
+                "numeric_id": struct.id
+            }
+            for point, struct in zip(points, structs)
+        ]
+    
     def search(
         self,
-        query_embedding: List[float],
+        query_embedding: np.ndarray,
         filter_urls: Optional[List[str]] = None,
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """Search for similar citations."""
         query_filter = None
+        url_set = None
+        search_limit = limit
         
-        if filter_urls:
+        if filter_urls and len(filter_urls) > MAX_FILTER_URLS:
+            # Unfiltered HNSW plus a set lookup beats a huge filter object
+            url_set = set(filter_urls)
+            search_limit = limit * 4
+        elif filter_urls:
+            # One MatchAny clause resolves through the source_url index
             query_filter = Filter(
-                should=[
+                must=[
                     FieldCondition(
                         key="source_url",
-                        match={"value": url}
+                        match=MatchAny(any=filter_urls)
                     )
-                    for url in filter_urls
                 ]
             )
         
         results = self.client.search(
             collection_name=self.collection_name,
-            query_vector=query_embedding,
+            query_vector=np.asarray(query_embedding, dtype=np.float32).tolist(),
             query_filter=query_filter,
-            limit=limit,
-            with_payload=True
+            limit=search_limit,
+            with_payload=True,
+            # Oversample on the int8 index, then rescore with the original vectors
+            search_params=SearchParams(
+                hnsw_ef=64,
+                quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+            )
         )
         
+        if url_set is not None:
+            results = [hit for hit in results if hit.payload.get("source_url") in url_set][:limit]
+        
         return [
             {
                 "id": hit.id,
@@ -157,29 +262,78 @@ class QdrantStorage:
         """Remove expired citations based on TTL."""
         current_time = datetime.utcnow().isoformat()
         
-        # Delete points where ttl_expires_at < current_time
+        # Delete points where ttl_expires_at (unix seconds) is in the past; the integer
+        # index resolves the range, and without wait the delete runs in the background
         result = self.client.delete(
             collection_name=self.collection_name,
-            points_selector=Filter(
-                must=[
-                    FieldCondition(
-                        key="ttl_expires_at",
-                        range=Range(lt=current_time)
-                    )
-                ]
-            )
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[
+                        FieldCondition(
+                            key="ttl_expires_at",
+                            range=Range(lt=int(time.time()))
+                        )
+                    ]
+                )
+            ),
+            wait=False
         )
         
+        legacy_deleted = self._cleanup_legacy_expired(current_time)
+        
         return {
             "status": "completed",
             "deleted_count": result.status if hasattr(result, 'status') else 0,
+            "legacy_deleted_count": legacy_deleted,
             "cleanup_time": current_time
         }
+    
+    def _cleanup_legacy_expired(self, current_time: str) -> int:
+        """Delete expired points whose ttl_expires_at is still an ISO-8601 string."""
+        # An integer range never matches a string, so must_not selects the legacy points
+        legacy_filter = Filter(
+            must_not=[
+                FieldCondition(
+                    key="ttl_expires_at",
+                    range=Range(gte=0)
+                )
+            ]
+        )
+        
+        deleted = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=legacy_filter,
+                limit=LEGACY_SCROLL_LIMIT,
+                offset=offset,
+                with_payload=["ttl_expires_at"],
+                with_vectors=False
+            )
+            
+            # ISO-8601 strings in the same format compare correctly as text
+            expired = [
+                point.id for point in points
+                if isinstance(point.payload.get("ttl_expires_at"), str)
+                and point.payload["ttl_expires_at"] < current_time
+            ]
+            if expired:
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=PointIdsList(points=expired)
+                )
+                deleted += len(expired)
+            
+            if offset is None:
+                return deleted
 
 
 # Global instances
 _embedding_client: Optional[EmbeddingClient] = None
 _qdrant_storage: Optional[QdrantStorage] = None
+_cache_client: Optional[redis.Redis] = None
+_embed_pool: Optional[ThreadPoolExecutor] = None
 
 
 def get_embedding_client() -> EmbeddingClient:
@@ -198,27 +352,141 @@ def get_qdrant_storage() -> QdrantStorage:
     return _qdrant_storage
 
 
-def embed_text(text: str) -> List[float]:
+def get_cache_client() -> redis.Redis:
+    """Get or create the Redis client for the embedding cache."""
+    global _cache_client
+    if not _cache_client:
+        # Vectors are stored as raw float16 bytes, so responses must not be decoded
+        _cache_client = redis.from_url(REDIS_URL, decode_responses=False)
+    return _cache_client
+
+
+def get_embed_pool() -> ThreadPoolExecutor:
+    """Get or create the thread pool that overlaps TEI batch requests."""
+    global _embed_pool
+    if not _embed_pool:
+        _embed_pool = ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix="tei")
+    return _embed_pool
+
+
+def _cache_key(text: str) -> str:
+    """Embedding cache key for a (truncated) text."""
+    return "emb:" + hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _cached_embeddings(keys: List[str]) -> List[Optional[np.ndarray]]:
+    """Look up cached embeddings; None marks a miss."""
+    try:
+        raw = get_cache_client().mget(keys)
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache lookup failed: {e}")
+        return [None] * len(keys)
+    
+    return [
+        np.frombuffer(value, dtype=np.float16) if value else None
+        for value in raw
+    ]
+
+
+def _cache_embeddings(entries: List[Tuple[str, np.ndarray]]):
+    """Store embeddings as float16 bytes, ~1.5 KB per 768-dim vector."""
+    if not entries:
+        return
+    
+    try:
+        pipe = get_cache_client().pipeline(transaction=False)
+        for key, embedding in entries:
+            pipe.set(key, np.asarray(embedding, dtype=np.float16).tobytes(), ex=EMBEDDING_CACHE_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Embedding cache write failed: {e}")
+
+
+# Truncate text if too long (TEI has input limits)
+MAX_TEXT_LENGTH = 512 * 4  # ~512 tokens
+
+
+def embed_text(text: str) -> np.ndarray:
     """Generate embedding for text."""
+    text = text[:MAX_TEXT_LENGTH]
+    key = _cache_key(text)
+    cached = _cached_embeddings([key])[0]
+    if cached is not None:
+        return cached
+    
     client = get_embedding_client()
+    embedding = client.embed(text)
+    _cache_embeddings([(key, embedding)])
+    return embedding
+
+
+def _embed_batch(client: EmbeddingClient, batch: List[str]) -> List[Optional[np.ndarray]]:
+    """Embed one TEI batch, retrying text by text if the batch fails."""
+    try:
+        return list(client.embed_batch(batch))
+    except Exception as e:
+        # Retry the failed batch one text at a time so one bad input doesn't sink the rest
+        logger.warning(f"TEI batch of {len(batch)} failed, retrying individually: {e}")
     
-    # Truncate text if too long (TEI has input limits)
-    max_length = 512 * 4  # ~512 tokens
-    if len(text) > max_length:
-        text = text[:max_length]
+    embeddings: List[Optional[np.ndarray]] = []
+    for text in batch:
+        try:
+            embeddings.append(client.embed(text))
+        except Exception as text_error:
+            logger.error(f"TEI embedding failed for text: {text_error}")
+            embeddings.append(None)
+    return embeddings
+
+
+def embed_texts(texts: List[str]) -> List[Optional[np.ndarray]]:
+    """Generate embeddings for many texts in TEI batches; None marks a text that failed."""
+    client = get_embedding_client()
+    texts = [text[:MAX_TEXT_LENGTH] for text in texts]
+    keys = [_cache_key(text) for text in texts]
+    embeddings = _cached_embeddings(keys)
+    
+    # Only texts missing from the cache go to TEI
+    misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    batches = [
+        [texts[i] for i in misses[start:start + BATCH_SIZE]]
+        for start in range(0, len(misses), BATCH_SIZE)
+    ]
+    
+    # Batches are network-bound, so keep several in flight; map preserves order
+    computed: List[Optional[np.ndarray]] = []
+    if len(batches) > 1:
+        for result in get_embed_pool().map(lambda batch: _embed_batch(client, batch), batches):
+            computed.extend(result)
+    elif batches:
+        computed.extend(_embed_batch(client, batches[0]))
+    
+    for i, embedding in zip(misses, computed):
+        embeddings[i] = embedding
+    _cache_embeddings([
+        (keys[i], embedding) for i, embedding in zip(misses, computed) if embedding is not None
+    ])
     
-    return client.embed(text)
+    return embeddings
 
 
 def upsert_to_qdrant(
     citation_id: str,
-    embedding: List[float],
+    embedding: np.ndarray,
     text: str,
-    metadata: Dict[str, Any]
+    metadata: Dict[str, Any],
+    numeric_id: Optional[int] = None
 ) -> Dict[str, Any]:
     """Upsert citation to Qdrant."""
     storage = get_qdrant_storage()
-    return storage.upsert(citation_id, embedding, text, metadata)
+    return storage.upsert(citation_id, embedding, text, metadata, numeric_id)
+
+
+def upsert_batch_to_qdrant(
+    points: List[tuple]
+) -> List[Dict[str, Any]]:
+    """Upsert many citations to Qdrant in one request."""
+    storage = get_qdrant_storage()
+    return storage.upsert_batch(points)
 
 
 def search_citations(
@@ -5,10 +5,13 @@ import re
 import time
 import hashlib
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 from urllib.parse import urlparse, urlunparse, urljoin
 
+import numpy as np
+import xxhash
 import redis
 import requests
 from requests.adapters import HTTPAdapter
@@ -16,7 +19,7 @@ from urllib3.util.retry import Retry
 
 from libs.normalizers import normalize_content
 from libs.links import extract_links, is_url_allowed
-from worker.embeddings import embed_text, upsert_to_qdrant
+from worker.embeddings import embed_texts, upsert_batch_to_qdrant
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +44,8 @@ def create_http_session() -> requests.Session:
         status_forcelist=[500, 502, 503, 504]
     )
     
-    adapter = HTTPAdapter(max_retries=retry)
+    # Sized for one shared session serving many citation hosts concurrently
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=32, pool_maxsize=64)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     
@@ -57,31 +61,32 @@ def create_http_session() -> requests.Session:
     return session
 
 
+# One pooled session per process. The forking RQ worker runs each job in a fresh work-horse,
+# so connections are only reused across jobs under rq.SimpleWorker
+_HTTP_SESSION = create_http_session()
+
+
+@lru_cache(maxsize=8192)
 def canonicalize_url(url: str) -> str:
     """Canonicalize URL for consistent storage."""
-    parsed = urlparse(url.lower())
-    
     # Remove fragment
-    parsed = parsed._replace(fragment="")
+    parsed = urlparse(url.lower().partition("#")[0])
     
     # Remove trailing slash from path
     path = parsed.path.rstrip("/") if parsed.path != "/" else "/"
-    parsed = parsed._replace(path=path)
     
     # Sort query parameters
-    if parsed.query:
-        params = sorted(parsed.query.split("&"))
-        parsed = parsed._replace(query="&".join(params))
+    query = "&".join(sorted(parsed.query.split("&"))) if parsed.query else parsed.query
     
-    return urlunparse(parsed)
+    # Citation graphs revisit the same URLs; repeats come from the cache
+    return urlunparse(parsed._replace(path=path, query=query))
 
 
 def fetch_url(url: str, session: Optional[requests.Session] = None) -> Dict[str, Any]:
     """Fetch URL with timeout and size limits."""
     from app.main import metrics
     
-    if not session:
-        session = create_http_session()
+    session = session or _HTTP_SESSION
     
     canonical_url = canonicalize_url(url)
     
@@ -92,48 +97,50 @@ def fetch_url(url: str, session: Optional[requests.Session] = None) -> Dict[str,
         raise ValueError(f"URL not allowed by filter: {canonical_url}")
     
     try:
-        response = session.get(
+        # Closing the streamed response returns its connection to the pool, even on the size errors
+        with session.get(
             canonical_url,
             timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
             stream=True,
             allow_redirects=True,
             verify=True
-        )
-        response.raise_for_status()
-        
-        # Check content size
-        content_length = response.headers.get("Content-Length")
-        if content_length and int(content_length) > MAX_CONTENT_SIZE:
-            metrics["fetched_err"].inc()
-            raise ValueError(f"Content too large: {content_length} bytes")
-        
-        # Read content with size limit
-        content_chunks = []
-        total_size = 0
-        
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                content_chunks.append(chunk)
-                total_size += len(chunk)
-                
-                if total_size > MAX_CONTENT_SIZE:
-                    metrics["fetched_err"].inc()
-                    raise ValueError(f"Content exceeds maximum size: {total_size} bytes")
-        
-        content = b"".join(content_chunks)
-        
-        metrics["fetched_ok"].inc()
-        metrics["size_bytes"].observe(total_size)
-        
-        return {
-            "url": response.url,  # Final URL after redirects
-            "canonical_url": canonical_url,
-            "content": content,
-            "content_type": response.headers.get("Content-Type", "text/html"),
-            "status_code": response.status_code,
-            "size": total_size,
-            "fetched_at": datetime.utcnow().isoformat()
-        }
+        ) as response:
+            response.raise_for_status()
+            
+            # Check content size
+            content_length = response.headers.get("Content-Length")
+            if content_length and int(content_length) > MAX_CONTENT_SIZE:
+                metrics["fetched_err"].inc()
+                raise ValueError(f"Content too large: {content_length} bytes")
+            
+            # Read content with size limit into one growing buffer, fingerprinting as we go
+            content = bytearray()
+            content_hash = hashlib.sha256()
+            
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    content.extend(chunk)
+                    content_hash.update(chunk)
+                    
+                    if len(content) > MAX_CONTENT_SIZE:
+                        metrics["fetched_err"].inc()
+                        raise ValueError(f"Content exceeds maximum size: {len(content)} bytes")
+            
+            total_size = len(content)
+            
+            metrics["fetched_ok"].inc()
+            metrics["size_bytes"].observe(total_size)
+            
+            return {
+                "url": response.url,  # Final URL after redirects
+                "canonical_url": canonical_url,
+                "content": bytes(content),
+                "content_hash": content_hash.hexdigest(),
+                "content_type": response.headers.get("Content-Type", "text/html"),
+                "status_code": response.status_code,
+                "size": total_size,
+                "fetched_at": datetime.utcnow().isoformat()
+            }
     
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to fetch URL {url}: {e}")
@@ -146,8 +153,10 @@ def parse_normalize(content: bytes, content_type: str, url: str) -> Dict[str, An
     try:
         normalized = normalize_content(content, content_type, url)
         
-        # Extract links from normalized content
-        links = extract_links(normalized.get("text", ""), url)
+        # HTML pages bring their links from the parse; other formats are scanned as text
+        links = normalized.get("links")
+        if links is None:
+            links = extract_links(normalized.get("text", ""), url)
         
         return {
             **normalized,
@@ -160,11 +169,25 @@ def parse_normalize(content: bytes, content_type: str, url: str) -> Dict[str, An
         raise
 
 
+# Sentence end markers in order of preference, with how much of each stays in the chunk.
+# Lookaheads so overlapping runs (e.g. "\n\n\n") report every position, as rfind would.
+_CHUNK_BREAKS = [
+    (marker, len(marker.rstrip()), re.compile(f"(?={re.escape(marker)})"))
+    for marker in ['. ', '\n\n', '\n', '! ', '? ']
+]
+
+
 def chunk_text(text: str, max_length: int = 500, overlap: int = 50) -> List[str]:
     """Split text into overlapping chunks."""
     if len(text) <= max_length:
         return [text]
     
+    # Locate every candidate break once, then binary-search them per window
+    breaks = [
+        (len(marker), keep, np.fromiter((m.start() for m in pattern.finditer(text)), dtype=np.int64))
+        for marker, keep, pattern in _CHUNK_BREAKS
+    ]
+    
     chunks = []
     start = 0
     
@@ -173,11 +196,11 @@ def chunk_text(text: str, max_length: int = 500, overlap: int = 50) -> List[str]
         
         # Try to break at sentence boundary
         if end < len(text):
-            # Look for sentence end markers
-            for marker in ['. ', '\n\n', '\n', '! ', '? ']:
-                last_marker = text.rfind(marker, start, end)
-                if last_marker != -1 and last_marker > start + max_length // 2:
-                    end = last_marker + len(marker.rstrip())
+            # Last marker that fits in the window, if it falls in the window's second half
+            for marker_length, keep, positions in breaks:
+                idx = np.searchsorted(positions, end - marker_length, side="right") - 1
+                if idx >= 0 and positions[idx] > start + max_length // 2:
+                    end = int(positions[idx]) + keep
                     break
         
         chunks.append(text[start:end])
@@ -193,7 +216,8 @@ def embed_upsert(
     parent_chunk_id: str,
     depth: int,
     title: Optional[str] = None,
-    content_type: str = "text/html"
+    content_type: str = "text/html",
+    links: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """Embed text and upsert to Qdrant."""
     from app.main import metrics
@@ -205,59 +229,66 @@ def embed_upsert(
         
         results = []
         stored_chunks = 0
+        points = []
+        
+        # Embed all chunks up front in TEI batches
+        embeddings = embed_texts(chunks)
         
-        for chunk_idx, chunk_content in enumerate(chunks):
-            # Generate unique ID for this chunk
-            citation_id = hashlib.sha256(f"{parent_chunk_id}:{url}:chunk_{chunk_idx}".encode()).hexdigest()
+        fetched_at = datetime.utcnow()
+        # Unix seconds, so cleanup is an integer range over an indexed field
+        ttl_expires_at = int(time.time()) + TTL_DAYS * 86400
+        for chunk_idx, (chunk_content, embedding) in enumerate(zip(chunks, embeddings)):
+            # One 128-bit hash gives the chunk's citation ID and, from its top half, the Qdrant point ID
+            citation_id = xxhash.xxh3_128_hexdigest(f"{parent_chunk_id}:{url}:chunk_{chunk_idx}".encode())
+            numeric_id = int(citation_id[:16], 16)
             
+            if embedding is None:
+                logger.error(f"Failed to embed chunk {chunk_idx}")
+                continue
+            
+            # Prepare metadata
+            metadata = {
+                "source_url": url,
+                "parent_doc_id": parent_doc_id,
+                "parent_chunk_id": parent_chunk_id,
+                "fetched_at": fetched_at.isoformat(),
+                "ttl_expires_at": ttl_expires_at,
+                "depth": depth,
+                "title": title or url,
+                "content_type": content_type,
+                "text_preview": chunk_content[:500] if chunk_content else "",
+                "chunk_index": chunk_idx,
+                "total_chunks": len(chunks)
+            }
+            points.append((citation_id, embedding, chunk_content, metadata, numeric_id))
+        
+        # Upsert every embedded chunk to Qdrant in one request
+        if points:
             try:
-                # Embed text chunk
-                embedding = embed_text(chunk_content)
-                
-                # Prepare metadata
-                metadata = {
-                    "source_url": url,
-                    "parent_doc_id": parent_doc_id,
-                    "parent_chunk_id": parent_chunk_id,
-                    "fetched_at": datetime.utcnow().isoformat(),
-                    "ttl_expires_at": (datetime.utcnow() + timedelta(days=TTL_DAYS)).isoformat(),
-                    "depth": depth,
-                    "title": title or url,
-                    "content_type": content_type,
-                    "text_preview": chunk_content[:500] if chunk_content else "",
-                    "chunk_index": chunk_idx,
-                    "total_chunks": len(chunks)
-                }
-                
-                # Upsert to Qdrant
-                result = upsert_to_qdrant(
-                    citation_id=citation_id,
-                    embedding=embedding,
-                    text=chunk_content,
-                    metadata=metadata
-                )
-                
-                stored_chunks += 1
-                results.append({
-                    "citation_id": citation_id,
-                    "chunk_idx": chunk_idx,
-                    **result
-                })
-                
-            except Exception as chunk_error:
-                logger.error(f"Failed to embed chunk {chunk_idx}: {chunk_error}")
-                # Continue with other chunks
+                upserted = upsert_batch_to_qdrant(points)
+                stored_chunks = len(upserted)
+                results = [
+                    {"chunk_idx": point[3]["chunk_index"], **result}
+                    for point, result in zip(points, upserted)
+                ]
+            except Exception as upsert_error:
+                logger.error(f"Failed to upsert {len(points)} chunks for {url}: {upsert_error}")
         
         # Store links in Redis for the first chunk
         if text and stored_chunks > 0:
-            links = extract_links(text, url)
+            # Links found while parsing are reused; only direct callers fall back to a text scan
+            if links is None:
+                links = extract_links(text, url)
             if links:
                 redis_key = f"citation_links:{parent_chunk_id}:{url}"
-                redis_client.hset(redis_key, mapping={
+                # Write and set the TTL in one round trip
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.hset(redis_key, mapping={
                     "urls": ",".join(links[:10]),  # Store up to 10 links
                     "parent_chunk_id": parent_chunk_id
                 })
-                redis_client.expire(redis_key, TTL_DAYS * 86400)
+                pipe.expire(redis_key, TTL_DAYS * 86400)
+                pipe.execute()
         
         if stored_chunks > 0:
             metrics["embedded_ok"].inc()
@@ -275,6 +306,42 @@ def embed_upsert(
         raise
 
 
+def enqueue_child_citations(
+    links: List[str],
+    parent_doc_id: str,
+    parent_chunk_id: str,
+    depth: int
+) -> int:
+    """Enqueue links not processed recently as citations at the given depth."""
+    from rq import Queue
+    q = Queue("citations", connection=redis_client)
+    
+    # Check every child's processed marker in one round trip
+    pipe = redis_client.pipeline(transaction=False)
+    for link in links:
+        pipe.exists(f"citation_processed:{xxhash.xxh3_64_hexdigest(link.encode())}")
+    
+    # Enqueue every unprocessed child in a single Redis pipeline
+    child_jobs = [
+        Queue.prepare_data(
+            fetch_and_process_citation,
+            kwargs={
+                "url": link,
+                "parent_doc_id": parent_doc_id,
+                "parent_chunk_id": parent_chunk_id,
+                "depth": depth
+            },
+            timeout="10m"
+        )
+        for link, processed in zip(links, pipe.execute())
+        if not processed
+    ]
+    if child_jobs:
+        q.enqueue_many(child_jobs)
+    
+    return len(child_jobs)
+
+
 def fetch_and_process_citation(
     url: str,
     parent_doc_id: str,
@@ -285,16 +352,22 @@ def fetch_and_process_citation(
     logger.info(f"Processing citation: {url} (depth={depth})")
     
     # Check if already processed recently
-    cache_key = f"citation_processed:{hashlib.sha256(url.encode()).hexdigest()}"
+    cache_key = f"citation_processed:{xxhash.xxh3_64_hexdigest(url.encode())}"
     if redis_client.exists(cache_key):
         logger.info(f"Citation already processed recently: {url}")
         return {"status": "cached", "url": url}
     
-    session = create_http_session()
-    
     try:
         # Step 1: Fetch URL
-        fetch_result = fetch_url(url, session)
+        fetch_result = fetch_url(url)
+        
+        # Identical bytes already embedded under another URL (mirrors, redirects)
+        content_hash = fetch_result.get("content_hash")
+        content_key = f"content_seen:{content_hash}" if content_hash else None
+        if content_key and redis_client.exists(content_key):
+            logger.info(f"Content already embedded, skipping: {url}")
+            redis_client.setex(cache_key, TTL_DAYS * 86400, "1")
+            return {"status": "duplicate", "url": url}
         
         # Step 2: Parse and normalize
         parse_result = parse_normalize(
@@ -311,28 +384,28 @@ def fetch_and_process_citation(
             parent_chunk_id=parent_chunk_id,
             depth=depth,
             title=parse_result.get("title"),
-            content_type=fetch_result["content_type"]
+            content_type=fetch_result["content_type"],
+            links=parse_result.get("links")
         )
         
-        # Mark as processed with TTL
-        redis_client.setex(cache_key, TTL_DAYS * 86400, "1")
+        stored = embed_result.get("chunks_stored", 0) > 0
         
-        # Process child links if depth allows
-        if depth < 2 and parse_result.get("links"):
-            from rq import Queue
-            q = Queue("citations", connection=redis_client)
-            
-            for link in parse_result["links"][:3]:  # Process up to 3 child links
-                child_cache_key = f"citation_processed:{hashlib.sha256(link.encode()).hexdigest()}"
-                if not redis_client.exists(child_cache_key):
-                    q.enqueue(
-                        fetch_and_process_citation,
-                        url=link,
-                        parent_doc_id=parent_doc_id,
-                        parent_chunk_id=parent_chunk_id,
-                        depth=depth + 1,
-                        job_timeout="10m"
-                    )
+        # Mark URL and content as processed with TTL
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.setex(cache_key, TTL_DAYS * 86400, "1")
+        # Only content that actually reached Qdrant may short-circuit other URLs
+        if content_key and stored:
+            pipe.setex(content_key, TTL_DAYS * 86400, url)
+        pipe.execute()
+        
+        # Process child links if depth allows, only from a parent that was actually stored
+        if stored and depth < 2 and parse_result.get("links"):
+            enqueue_child_citations(
+                parse_result["links"][:3],  # Process up to 3 child links
+                parent_doc_id,
+                parent_chunk_id,
+                depth + 1
+            )
         
         # Extract citation_id from results (might be multiple chunks)
         citation_id = None
@@ -354,9 +427,6 @@ def fetch_and_process_citation(
             "url": url,
             "error": str(e)
         }
-    
-    finally:
-        session.close()
 
 
 def cleanup_expired_citations():